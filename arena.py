@@ -0,0 +1,167 @@
+"""
+Headless self-play arena
+
+Plays two engines against each other for a number of games, without a display, swapping colours every game, and
+reports each engine's wins, draws and losses, its average time per move and the number of games played per second.
+Games are split between worker processes.
+
+Engines:
+    minimax     full search, without the solution table
+    depth:N     iterative deepening to N moves ahead, scoring deeper positions heuristically
+    random      a random empty cell
+    book        the solution table, falling back to search
+    mcts:N      Monte Carlo tree search with N tree steps a move (mcts alone for the default), seeded from the game
+
+    python arena.py minimax random --games 200 --workers 4
+    python arena.py book book --games 100         perfect play always draws
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+from bitboard import X, O
+
+
+def engine(spec):
+    """
+    Returns a function (board, rng) -> action for an engine spec, raising ValueError for an unknown spec.
+    """
+    name, _, argument = spec.partition(":")
+    if (name == "minimax" and not argument):
+        return lambda board, rng: ttt.minimax(board, lookup=False)
+    if (name == "book" and not argument):
+        return lambda board, rng: ttt.minimax(board)
+    if (name == "random" and not argument):
+        return lambda board, rng: rng.choice(sorted(ttt.actions(board)))
+    if (name == "mcts" and (not argument or (argument.isdigit() and int(argument) > 0))):
+        return _monte_carlo_engine(int(argument) if argument else None)
+    if (name == "depth" and argument.isdigit() and int(argument) > 0):
+        max_depth = int(argument)
+        return lambda board, rng: ttt.minimax(board, max_depth=max_depth)
+    raise ValueError(f"Unknown engine: {spec}")
+
+
+def _monte_carlo_engine(steps):
+    """
+    Returns a Monte Carlo tree search engine function for one game, which keeps its tree between moves and is seeded
+    from the game's rng on its first move, so seeded matches are reproducible.
+    """
+    import mcts
+    searchers = []
+
+    def move(board, rng):
+        if (not searchers):
+            searchers.append(mcts.MCTS(ttt.GAME, seed=rng.getrandbits(32)))
+        cell = searchers[0].search(ttt.GAME.new_state(board), mcts.DEFAULT_STEPS if steps is None else steps)
+        return ttt.GAME.action(cell)
+    return move
+
+
+def play_game(x_engine, o_engine, rng):
+    """
+    Plays one game and returns (winner, x_latencies, o_latencies): X, O or None for a draw, and the seconds each
+    engine took over each of its moves.
+    """
+    board = ttt.initial_state()
+    latencies = {X: [], O: []}
+    engines = {X: x_engine, O: o_engine}
+    while not ttt.terminal(board):
+        mover = ttt.player(board)
+        start = time.perf_counter()
+        action = engines[mover](board, rng)
+        latencies[mover].append(time.perf_counter() - start)
+        board = ttt.result(board, action)
+    return ttt.winner(board), latencies[X], latencies[O]
+
+
+def _play(first_spec, second_spec, index, seed):
+    """
+    Worker task: plays game index, with the first engine as X in even games and as O in odd games.
+    Returns (outcome for the first engine: 1 win, 0 draw, -1 loss, first engine latencies, second engine latencies).
+    """
+    rng = random.Random(None if seed is None else seed + index)
+    first = engine(first_spec)
+    second = engine(second_spec)
+    if (index % 2 == 0):
+        winner, first_latencies, second_latencies = play_game(first, second, rng)
+        first_stone = X
+    else:
+        winner, second_latencies, first_latencies = play_game(second, first, rng)
+        first_stone = O
+    outcome = 0 if winner is None else (1 if winner == first_stone else -1)
+    return outcome, first_latencies, second_latencies
+
+
+def match(first_spec, second_spec, games=100, workers=None, seed=None):
+    """
+    Plays games games between two engines and returns a dict with the number of games, the seconds taken, the
+    games per second, and for each engine, in order, its spec, wins, draws, losses, moves and average move seconds.
+    """
+    engine(first_spec)
+    engine(second_spec)
+    if (workers is None):
+        workers = os.cpu_count() or 1
+
+    arguments = ([first_spec] * games, [second_spec] * games, range(games), [seed] * games)
+    start = time.perf_counter()
+    if (workers < 2):
+        results = list(map(_play, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_play, *arguments, chunksize=max(1, games // (workers * 4))))
+    elapsed = time.perf_counter() - start
+
+    engines = []
+    for spec, sign, position in ((first_spec, 1, 1), (second_spec, -1, 2)):
+        outcomes = [outcome * sign for outcome, *_ in results]
+        latencies = [latency for result in results for latency in result[position]]
+        engines.append({
+            "engine": spec,
+            "wins": outcomes.count(1),
+            "draws": outcomes.count(0),
+            "losses": outcomes.count(-1),
+            "moves": len(latencies),
+            "average_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+        })
+    return {
+        "games": games,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else None,
+        "engines": engines,
+    }
+
+
+def report(results):
+    """
+    Returns the lines of a human readable report of match results.
+    """
+    lines = [f"{'engine':<12} {'wins':>6} {'draws':>6} {'losses':>6} {'ms/move':>9}"]
+    for result in results["engines"]:
+        lines.append(f"{result['engine']:<12} {result['wins']:>6} {result['draws']:>6} {result['losses']:>6} "
+                     f"{result['average_latency'] * 1000:>9.3f}")
+    lines.append(f"{results['games']} games in {results['seconds']:.2f} s, "
+                 f"{results['games_per_second']:.1f} games/s")
+    return lines
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe engines against each other.")
+    parser.add_argument("first", help="minimax, depth:N, random, book or mcts:N")
+    parser.add_argument("second", help="minimax, depth:N, random, book or mcts:N")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--seed", type=int, help="seed for the random and mcts engines")
+    options = parser.parse_args(arguments)
+    try:
+        results = match(options.first, options.second, options.games, options.workers, options.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    print("\n".join(report(results)))
+
+
+if __name__ == "__main__":
+    main()
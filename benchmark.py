@@ -0,0 +1,211 @@
+"""
+Benchmark suite for the search engine
+
+Runs a fixed corpus of positions (the empty board, every one move opening and the mid-game positions of the unit
+tests) and reports, for a cold start minimax search of each, the wall time, nodes searched, nodes per second and peak
+memory. The per-call cost of result(), winner(), terminal() and actions() is measured over the same corpus, and the
+memory per stored position of every reachable position as list-of-lists boards and as Board values.
+
+Results can be written to JSON and compared with an earlier run, flagging anything that got slower:
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json --output after.json
+The exit status is 1 if any time regressed by more than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import bitboard
+import gametree
+import tictactoe as ttt
+from bitboard import X, O, EMPTY, Board
+from transposition import TranspositionTable
+
+
+def corpus():
+    """
+    Returns the list of (name, board) positions benchmarked.
+    """
+    positions = [("empty", ttt.initial_state())]
+    for i in range(3):
+        for j in range(3):
+            positions.append((f"opening {i},{j}", ttt.result(ttt.initial_state(), (i, j))))
+    positions.extend([
+        ("midgame actions", [[X, O, EMPTY],
+                             [O, EMPTY, X],
+                             [X, EMPTY, O]]),
+        ("take immediate win", [[X, X, EMPTY],
+                                [O, O, EMPTY],
+                                [EMPTY, EMPTY, EMPTY]]),
+        ("choose from two wins", [[X, O, X],
+                                  [O, X, O],
+                                  [EMPTY, EMPTY, EMPTY]]),
+        ("prevent immediate loss", [[O, X, EMPTY],
+                                    [EMPTY, X, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]]),
+    ])
+    return positions
+
+
+def bench_search(board, repeats):
+    """
+    Returns the measurements of a cold start search of board: a fresh transposition table every run, no solution
+    table lookup. The time is the best of repeats runs; peak memory comes from one extra traced run.
+    """
+    x, o = bitboard.from_board(board)
+    best = None
+    for _ in range(repeats):
+        context = bitboard.Context(TranspositionTable())
+        start = time.perf_counter()
+        bitboard.minimax(x, o, context=context)
+        elapsed = time.perf_counter() - start
+        if (best is None or elapsed < best):
+            best = elapsed
+
+    tracemalloc.start()
+    bitboard.minimax(x, o, context=bitboard.Context(TranspositionTable()))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "nodes": context.nodes,
+        "nodes_per_second": context.nodes / best if best else None,
+        "peak_bytes": peak,
+    }
+
+
+def bench_function(function, arguments, repeats):
+    """
+    Returns the best seconds per call of function over the argument tuples, out of repeats passes.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for argument in arguments:
+            function(*argument)
+        elapsed = time.perf_counter() - start
+        if (best is None or elapsed < best):
+            best = elapsed
+    return best / len(arguments)
+
+
+def bench_memory():
+    """
+    Returns a dict of the bytes per position of keeping every reachable position as list-of-lists boards and as
+    Board values, with their player, winner and terminal computed.
+    """
+    keys = [bitboard.from_board(state.to_board())
+            for state in gametree.walk(ttt.GAME.new_state(), visited=gametree.VisitedBitmap(9))]
+    results = {}
+    for name, build in (("list", bitboard.to_board), ("Board", Board)):
+        tracemalloc.start()
+        boards = [build(x, o) for x, o in keys]
+        for board in boards:
+            ttt.player(board), ttt.winner(board), ttt.terminal(board)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = size / len(boards)
+        del boards
+    return results
+
+
+def run(repeats=5):
+    """
+    Runs the benchmarks and returns the results as a dict.
+    """
+    positions = corpus()
+    boards = [board for _, board in positions]
+    moves = [(board, min(ttt.actions(board))) for board in boards if ttt.actions(board)]
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "search": {name: bench_search(board, repeats) for name, board in positions},
+        "functions": {
+            "result": bench_function(ttt.result, moves, repeats * 20),
+            "winner": bench_function(ttt.winner, [(board,) for board in boards], repeats * 20),
+            "terminal": bench_function(ttt.terminal, [(board,) for board in boards], repeats * 20),
+            "actions": bench_function(ttt.actions, [(board,) for board in boards], repeats * 20),
+            "minimax lookup": bench_function(ttt.minimax, [(board,) for board in boards], repeats * 20),
+            "Board result": bench_function(Board.result, [(Board.from_list(board), action) for board, action in moves],
+                                           repeats * 20),
+            "Board winner": bench_function(ttt.winner, [(Board.from_list(board),) for board in boards], repeats * 20),
+        },
+        "memory": bench_memory(),
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Returns (lines, regressed): a line per measurement comparing current with baseline, and whether any time got
+    slower by more than threshold (a fraction).
+    """
+    lines = []
+    regressed = False
+    pairs = [(f"search {name}", baseline["search"].get(name, {}).get("seconds"), results["seconds"])
+             for name, results in current["search"].items()]
+    pairs.extend((f"call {name}", baseline["functions"].get(name), seconds)
+                 for name, seconds in current["functions"].items())
+    for name, before, after in pairs:
+        if (not before):
+            lines.append(f"{name:<32} {'new':>9}")
+            continue
+        change = after / before - 1
+        flag = ""
+        if (change > threshold):
+            flag = "  REGRESSION"
+            regressed = True
+        lines.append(f"{name:<32} {change:>+9.1%}{flag}")
+    return lines, regressed
+
+
+def report(results):
+    """
+    Returns the lines of a human readable report of results.
+    """
+    lines = [f"{'position':<24} {'seconds':>9} {'nodes':>6} {'nodes/s':>9} {'peak KiB':>9}"]
+    for name, search in results["search"].items():
+        lines.append(f"{name:<24} {search['seconds']:>9.5f} {search['nodes']:>6} "
+                     f"{search['nodes_per_second']:>9.0f} {search['peak_bytes'] / 1024:>9.1f}")
+    lines.append("")
+    lines.append(f"{'function':<24} {'us/call':>9}")
+    for name, seconds in results["functions"].items():
+        lines.append(f"{name:<24} {seconds * 1e6:>9.2f}")
+    lines.append("")
+    lines.append(f"{'stored position':<24} {'bytes':>9}")
+    for name, size in results.get("memory", {}).items():
+        lines.append(f"{name:<24} {size:>9.1f}")
+    return lines
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe search engine.")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per measurement, best is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slow-down fraction reported as a regression")
+    options = parser.parse_args(arguments)
+
+    results = run(options.repeats)
+    print("\n".join(report(results)))
+    if (options.output):
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if (options.compare):
+        with open(options.compare) as file:
+            baseline = json.load(file)
+        lines, regressed = compare(baseline, results, options.threshold)
+        print()
+        print("\n".join(lines))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,741 @@
+"""
+Bitboard Tic Tac Toe engine
+
+A position is stored as two 9 bit integers: a mask of the cells held by X and a mask of the cells held by O.
+Cell (i, j) of the list-of-lists board maps to bit (i * 3 + j) of each mask.
+Win lines, set bit counts and the empty cells of every mask are precomputed, so evaluating a node of the search
+is a handful of integer operations and table lookups with no allocation.
+Before searching a node, the threat masks settle the simple tactics: a mover that can win at once scores the win,
+a mover facing two threats scores the loss, and a mover facing one threat searches only the cell that blocks it.
+"""
+
+import sys
+import time
+
+import symmetry
+from stats import SearchStats
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# mask with all nine cells set
+FULL = 0b111111111
+
+# single cell masks, indexed by cell
+BIT = tuple(1 << cell for cell in range(9))
+
+WIN_MASKS = (
+    0b000000111,  # row 0
+    0b000111000,  # row 1
+    0b111000000,  # row 2
+    0b001001001,  # column 0
+    0b010010010,  # column 1
+    0b100100100,  # column 2
+    0b100010001,  # topleft to bottomright diagonal
+    0b001010100,  # topright to bottomleft diagonal
+)
+
+# number of set bits in each 9 bit mask
+POPCOUNT = tuple(bin(mask).count("1") for mask in range(FULL + 1))
+
+# True for each 9 bit mask that contains a complete win line
+WINNING = tuple(any(mask & line == line for line in WIN_MASKS) for mask in range(FULL + 1))
+
+# cell indexes of the set bits of each 9 bit mask, in ascending order
+CELLS = tuple(tuple(cell for cell in range(9) if mask & BIT[cell]) for mask in range(FULL + 1))
+
+# THREATS[mask] is the mask of cells that would complete a win line for a player holding mask
+def _threats(mask):
+    threats = 0
+    for line in WIN_MASKS:
+        if (POPCOUNT[mask & line] == 2):
+            threats |= line & ~mask
+    return threats
+
+
+THREATS = tuple(_threats(mask) for mask in range(FULL + 1))
+
+# static move priority: centre, then corners, then edges
+STATIC_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# cell indexes of the set bits of each 9 bit mask, in static priority order
+STATIC_CELLS = tuple(tuple(cell for cell in STATIC_ORDER if mask & BIT[cell]) for mask in range(FULL + 1))
+
+# base 3 value of each 9 bit mask with every set cell as digit 1: the ternary index of a position, with cell c as
+# digit c (0 empty, 1 X, 2 O), is TERNARY[x] + 2 * TERNARY[o]
+TERNARY = tuple(sum(3 ** cell for cell in CELLS[mask]) for mask in range(FULL + 1))
+
+# base 3 value of each row of a list-of-lists board, keyed by the tuple of its cells
+ROW_TERNARY = {tuple(X if x & BIT[cell] else (O if o & BIT[cell] else EMPTY) for cell in range(3)):
+               TERNARY[x] + 2 * TERNARY[o] for x in range(8) for o in range(8) if not x & o}
+
+
+def _positions():
+    """
+    Returns the table of (player, winner, terminal, empty cell mask) of every position, by ternary index.
+    Each X mask is paired with every submask of the cells it leaves empty.
+    """
+    positions = [None] * 3 ** 9
+    for x in range(FULL + 1):
+        rest = FULL ^ x
+        o = rest
+        while True:
+            empty = rest ^ o
+            position_winner = X if WINNING[x] else (O if WINNING[o] else None)
+            positions[TERNARY[x] + 2 * TERNARY[o]] = (O if POPCOUNT[x] > POPCOUNT[o] else X, position_winner,
+                                                       position_winner is not None or not empty, empty)
+            if (not o):
+                break
+            o = (o - 1) & rest
+    return tuple(positions)
+
+
+# POSITIONS[ternary index] is (player, winner, terminal, empty cell mask) of the position
+POSITIONS = _positions()
+
+# The search scores a finished game as the utility times (1 + the number of empty cells), so that X prefers
+# quicker wins and slower losses, and O the reverse. The sign of a score is the game theoretic value.
+MIN_SCORE = -sys.maxsize - 1
+MAX_SCORE = sys.maxsize
+
+# transposition table shared by searches that do not supply their own
+TABLE = TranspositionTable()
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboard pair for a list-of-lists board or a Board.
+    """
+    if (isinstance(board, Board)):
+        return board.key & FULL, board.key >> 9
+    x = 0
+    o = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if (cell == X):
+                x |= bit
+            elif (cell == O):
+                o |= bit
+            bit <<= 1
+    return x, o
+
+
+def ternary_index(board):
+    """
+    Returns the ternary index of a list-of-lists board or a Board, for looking it up in POSITIONS.
+    """
+    if (isinstance(board, Board)):
+        return TERNARY[board.key & FULL] + 2 * TERNARY[board.key >> 9]
+    return ROW_TERNARY[tuple(board[0])] + 27 * ROW_TERNARY[tuple(board[1])] + 729 * ROW_TERNARY[tuple(board[2])]
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for an (x, o) bitboard pair.
+    """
+    board = []
+    for row_index in range(3):
+        row = []
+        for col_index in range(3):
+            bit = BIT[row_index * 3 + col_index]
+            if (x & bit):
+                row.append(X)
+            elif (o & bit):
+                row.append(O)
+            else:
+                row.append(EMPTY)
+        board.append(row)
+    return board
+
+
+def cell_index(action):
+    """
+    Returns the cell index of action (i, j).
+    """
+    return action[0] * 3 + action[1]
+
+
+def cell_action(cell):
+    """
+    Returns the action (i, j) of a cell index.
+    """
+    return divmod(cell, 3)
+
+
+def position_key(x, o):
+    """
+    Returns the unique key of a position.
+    Transposition table entries are keyed by the position key of the canonical representative of a position.
+    """
+    return x | (o << 9)
+
+
+def player(x, o):
+    """
+    Returns the player who has the next turn.
+    """
+    if (POPCOUNT[x] > POPCOUNT[o]):
+        return O
+    else:
+        return X
+
+
+def actions(x, o):
+    """
+    Returns the cell indexes of the empty cells, in ascending order.
+    """
+    return CELLS[FULL ^ (x | o)]
+
+
+def result(x, o, cell):
+    """
+    Returns the (x, o) pair that results from the player to move taking cell.
+    """
+    if ((x | o) & BIT[cell]):
+        raise Exception(f"Invalid action: {cell_action(cell)} on board: {to_board(x, o)}")
+    if (POPCOUNT[x] > POPCOUNT[o]):
+        return x, o | BIT[cell]
+    else:
+        return x | BIT[cell], o
+
+
+def winner(x, o):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    if (WINNING[x]):
+        return X
+    elif (WINNING[o]):
+        return O
+    else:
+        return None
+
+
+def terminal(x, o):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return WINNING[x] or WINNING[o] or (x | o) == FULL
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    if (WINNING[x]):
+        return 1
+    elif (WINNING[o]):
+        return -1
+    else:
+        return 0
+
+
+def score_value(score):
+    """
+    Returns the game theoretic value of a score: 1 if X wins, -1 if O wins, 0 for a tie.
+    """
+    return (score > 0) - (score < 0)
+
+
+def score_plies(x, o, score):
+    """
+    Returns the number of plies from position (x, o) until the game is won or lost with a given score,
+    or None if the score is a tie.
+    """
+    if (score == 0):
+        return None
+    return POPCOUNT[FULL ^ (x | o)] - abs(score) + 1
+
+
+# marks a Board property not yet computed
+_UNSET = object()
+
+# cells of each row of a Board, indexed by the row's 18 bit (x | o << 9) slice
+ROW_TOKENS = tuple(tuple(X if x & BIT[cell] else (O if o & BIT[cell] else EMPTY) for cell in range(3))
+                   for o in range(8) for x in range(8))
+
+
+class Board:
+    """
+    Immutable Tic Tac Toe board, packed into its position key (x | o << 9).
+    Boards are hashable and compare by position, so they can be used as dict keys. board[i][j] reads a cell as a
+    list-of-lists board does. player, winner and terminal are computed on first use and kept.
+    """
+
+    __slots__ = ("key", "_player", "_winner", "_terminal")
+
+    def __init__(self, x=0, o=0):
+        if ((x | o) & ~FULL):
+            raise ValueError(f"Masks outside the board: {x:#x}, {o:#x}")
+        if (x & o):
+            raise ValueError(f"Cells held by both players: {x & o:09b}")
+        object.__setattr__(self, "key", x | o << 9)
+        object.__setattr__(self, "_player", _UNSET)
+        object.__setattr__(self, "_winner", _UNSET)
+        object.__setattr__(self, "_terminal", _UNSET)
+
+    @classmethod
+    def from_list(cls, board):
+        """
+        Returns the Board of a list-of-lists board.
+        """
+        return cls(*from_board(board))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Board is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Board is immutable")
+
+    def __eq__(self, other):
+        if (isinstance(other, Board)):
+            return self.key == other.key
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __reduce__(self):
+        return (Board, (self.key & FULL, self.key >> 9))
+
+    def __repr__(self):
+        return f"Board({self.to_list()!r})"
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, row_index):
+        """
+        Returns row row_index as a tuple of cells.
+        """
+        if (not -3 <= row_index < 3):
+            raise IndexError("Board row out of range")
+        shift = (row_index % 3) * 3
+        key = self.key
+        return ROW_TOKENS[(key >> shift & 7) | (key >> (shift + 9) & 7) << 3]
+
+    def __iter__(self):
+        return (self[row_index] for row_index in range(3))
+
+    def to_list(self):
+        """
+        Returns the list-of-lists board.
+        """
+        return to_board(self.key & FULL, self.key >> 9)
+
+    @property
+    def player(self):
+        value = self._player
+        if (value is _UNSET):
+            value = player(self.key & FULL, self.key >> 9)
+            object.__setattr__(self, "_player", value)
+        return value
+
+    @property
+    def winner(self):
+        value = self._winner
+        if (value is _UNSET):
+            value = winner(self.key & FULL, self.key >> 9)
+            object.__setattr__(self, "_winner", value)
+        return value
+
+    @property
+    def terminal(self):
+        value = self._terminal
+        if (value is _UNSET):
+            value = terminal(self.key & FULL, self.key >> 9)
+            object.__setattr__(self, "_terminal", value)
+        return value
+
+    def result(self, action):
+        """
+        Returns the Board after the player to move takes action (i, j), raising an exception if the cell is taken.
+        """
+        return Board(*result(self.key & FULL, self.key >> 9, cell_index(action)))
+
+
+class Context:
+    """
+    State of one search: the transposition table, the move ordering tables and the search statistics.
+    Killer moves are kept per ply (the number of stones on the board), history scores per player and cell.
+    The search recurses through the context's max_value and min_value. With on_node, they are wrapped to call
+    on_node(ply, depth, alpha, beta, context) on entering every node, where ply is the number of stones on the board
+    and depth the number of moves left to search, which is every empty cell; without it they are the plain functions.
+    """
+
+    def __init__(self, table=None, stats=None, on_node=None):
+        self.table = TABLE if table is None else table
+        self.stats = SearchStats() if stats is None else stats
+        self.killers = [[None, None] for _ in range(10)]
+        self.history = ([0] * 9, [0] * 9)
+        self.max_value = max_value
+        self.min_value = min_value
+        if (on_node is not None):
+            self.max_value = self._hooked(max_value, on_node)
+            self.min_value = self._hooked(min_value, on_node)
+
+    def _hooked(self, function, on_node):
+        """
+        Returns function wrapped to call on_node first.
+        """
+        def value(x, o, alpha, beta, context):
+            ply = POPCOUNT[x | o]
+            on_node(ply, 9 - ply, alpha, beta, context)
+            return function(x, o, alpha, beta, context)
+        return value
+
+    @property
+    def nodes(self):
+        """
+        Returns the number of nodes searched.
+        """
+        return self.stats.total_nodes()
+
+    def cutoff(self, ply, side, cell, empty_count):
+        """
+        Records that cell caused a beta cutoff for side (0 for X, 1 for O) at ply with empty_count empty cells.
+        """
+        killers = self.killers[ply]
+        if (killers[0] != cell):
+            killers[1] = killers[0]
+            killers[0] = cell
+        self.history[side][cell] += empty_count * empty_count
+        if (side == 0):
+            self.stats.beta_cutoffs += 1
+        else:
+            self.stats.alpha_cutoffs += 1
+
+
+def ordered_cells(mover, opponent, empty, ply, side, hash_cell, context):
+    """
+    Returns the empty cells in search order: cells that win, cells that block a win, the best cell stored in the
+    transposition table, the killer moves of this ply, then the rest by history score, centre, corners and edges.
+    """
+    wins = THREATS[mover] & empty
+    blocks = THREATS[opponent] & empty & ~wins
+    ordered = list(STATIC_CELLS[wins])
+    ordered.extend(STATIC_CELLS[blocks])
+    rest = empty & ~(wins | blocks)
+    killers = context.killers[ply]
+    for cell in (hash_cell, killers[0], killers[1]):
+        if (cell is not None and rest & BIT[cell]):
+            ordered.append(cell)
+            rest ^= BIT[cell]
+    ordered.extend(sorted(STATIC_CELLS[rest], key=context.history[side].__getitem__, reverse=True))
+    return ordered
+
+
+def analyse(x, o, table=None, context=None):
+    """
+    Returns a list of (cell, score) pairs with the exact score of every empty cell of a non-terminal position.
+    Every move is searched with a full window through one shared transposition table, so moves after the first
+    mostly reuse entries stored while searching the others.
+    """
+    if (terminal(x, o)):
+        return []
+    if (context is None):
+        context = Context(table)
+
+    scores = []
+    for cell in CELLS[FULL ^ (x | o)]:
+        if (POPCOUNT[x] == POPCOUNT[o]):
+            score = context.min_value(x | BIT[cell], o, MIN_SCORE, MAX_SCORE, context)
+        else:
+            score = context.max_value(x, o | BIT[cell], MIN_SCORE, MAX_SCORE, context)
+        scores.append((cell, score))
+    return scores
+
+
+def minimax(x, o, table=None, context=None, on_depth=None):
+    """
+    Returns the optimal cell index for the player to move, or None if the game is over.
+    The root is searched with a full window, so its entry in the table is exact and holds the best cell:
+    searching the same position again is a single table probe.
+    Pass a Context to read the search statistics afterwards, or to call a per node hook. The search always runs to
+    the end of the game, so with on_depth, on_depth(depth, cell, score, stats) is called once, when it completes.
+    """
+    if (terminal(x, o)):
+        return None
+    if (context is None):
+        context = Context(table)
+    table = context.table
+    stats = context.stats
+    start = time.perf_counter()
+    hits = table.hits
+    misses = table.misses
+    root_x = x
+    root_o = o
+
+    optimal_cell = search_root(x, o, context)
+
+    stats.elapsed += time.perf_counter() - start
+    stats.hits += table.hits - hits
+    stats.probes += table.hits - hits + table.misses - misses
+    stats.pv = principal_variation(root_x, root_o, table)
+    stats.depth = max(stats.depth, 9 - POPCOUNT[root_x | root_o])
+    if (on_depth is not None):
+        entry = table.peek(symmetry.canonical_key(root_x, root_o)[0])
+        on_depth(9 - POPCOUNT[root_x | root_o], optimal_cell, None if entry is None else entry[0], stats)
+    return optimal_cell
+
+
+def search_root(x, o, context):
+    """
+    Returns the optimal cell index for the player to move in a non-terminal position.
+    """
+    table = context.table
+
+    # search the canonical position and map the best cell back to the caller's orientation
+    x, o, transform = symmetry.canonical(x, o)
+    inverse = symmetry.INVERSE[transform]
+    key = position_key(x, o)
+    entry = table.probe(key)
+    if (entry is not None and entry[1] == EXACT and entry[2] is not None):
+        return symmetry.transform_cell(entry[2], inverse)
+
+    ply = POPCOUNT[x | o]
+    stats = context.stats
+    stats.nodes[ply] += 1
+    empty = FULL ^ (x | o)
+    mover, opponent = (x, o) if POPCOUNT[x] == POPCOUNT[o] else (o, x)
+    wins = THREATS[mover] & empty
+    if (wins):
+        # the same tactics as inside the search: take a win at once, and search only the block of a single threat
+        stats.immediate_wins += 1
+        optimal_cell = STATIC_CELLS[wins][0]
+        table.store(key, POPCOUNT[empty] if POPCOUNT[x] == POPCOUNT[o] else -POPCOUNT[empty], EXACT, optimal_cell)
+        return symmetry.transform_cell(optimal_cell, inverse)
+    blocks = THREATS[opponent] & empty
+    if (blocks and not blocks & (blocks - 1)):
+        stats.forced_blocks += 1
+        cells = STATIC_CELLS[blocks]
+    else:
+        cells = root_cells(x, o, context)
+
+    stats.expanded[ply] += 1
+    optimal_cell = None
+    alpha = MIN_SCORE
+    beta = MAX_SCORE
+
+    if (POPCOUNT[x] == POPCOUNT[o]):
+        # maximising player
+        optimal_score = MIN_SCORE
+        for cell in cells:
+            score = context.min_value(x | BIT[cell], o, alpha, beta, context)
+            if (score > optimal_score):
+                optimal_score = score
+                optimal_cell = cell
+            alpha = max(alpha, score)
+    else:
+        # minimising player
+        optimal_score = MAX_SCORE
+        for cell in cells:
+            score = context.max_value(x, o | BIT[cell], alpha, beta, context)
+            if (score < optimal_score):
+                optimal_score = score
+                optimal_cell = cell
+            beta = min(beta, score)
+
+    table.store(key, optimal_score, EXACT, optimal_cell)
+    return symmetry.transform_cell(optimal_cell, inverse)
+
+
+def principal_variation(x, o, table=None):
+    """
+    Returns the list of cells of the best line of play from a position, as far as it can be read from the best
+    cells of the exact entries in the transposition table.
+    """
+    table = TABLE if table is None else table
+    pv = []
+    while (not terminal(x, o)):
+        key, transform = symmetry.canonical_key(x, o)
+        entry = table.peek(key)
+        if (entry is not None and entry[1] == EXACT and entry[2] is not None):
+            cell = symmetry.transform_cell(entry[2], symmetry.INVERSE[transform])
+        else:
+            # positions the search scored by its tactics have no entry: the win, or else a block, is the best cell
+            empty = FULL ^ (x | o)
+            mover, opponent = (x, o) if POPCOUNT[x] == POPCOUNT[o] else (o, x)
+            cells = STATIC_CELLS[THREATS[mover] & empty] or STATIC_CELLS[THREATS[opponent] & empty]
+            if (not cells):
+                break
+            cell = cells[0]
+        pv.append(cell)
+        x, o = result(x, o, cell)
+    return pv
+
+
+def solve_positions(positions, table=None):
+    """
+    Returns the optimal cell for each (x, o) pair in positions, or None for finished games.
+    All positions are searched through one Context, so later positions reuse the transposition table entries and
+    move ordering tables of earlier ones.
+    """
+    context = Context(table)
+    return [minimax(x, o, context=context) for x, o in positions]
+
+
+def root_cells(x, o, context=None):
+    """
+    Returns the empty cells of a position in search order, keeping only one cell of each group of moves
+    that lead to symmetric positions.
+    """
+    empty = FULL ^ (x | o)
+    ply = 9 - POPCOUNT[empty]
+    if (POPCOUNT[x] == POPCOUNT[o]):
+        ordered = ordered_cells(x, o, empty, ply, 0, None, context or Context())
+    else:
+        ordered = ordered_cells(o, x, empty, ply, 1, None, context or Context())
+    cells = []
+    seen = set()
+    for cell in ordered:
+        child_key, _ = symmetry.canonical_key(*result(x, o, cell))
+        if (child_key not in seen):
+            seen.add(child_key)
+            cells.append(cell)
+    return cells
+
+
+def max_value(x, o, alpha, beta, context):
+    """
+    Returns the score of a position with X to move.
+    """
+    empty = FULL ^ (x | o)
+    ply = 9 - POPCOUNT[empty]
+    stats = context.stats
+    stats.nodes[ply] += 1
+    if (WINNING[x]):
+        return 1 + POPCOUNT[empty]
+    if (WINNING[o]):
+        return -1 - POPCOUNT[empty]
+    if (not empty):
+        return 0
+
+    # tactics: a win now scores best, two threats cannot both be blocked, and one threat must be blocked
+    if (THREATS[x] & empty):
+        stats.immediate_wins += 1
+        return POPCOUNT[empty]
+    blocks = THREATS[o] & empty
+    if (blocks & (blocks - 1)):
+        stats.forced_losses += 1
+        return 1 - POPCOUNT[empty]
+
+    table = context.table
+    key, transform = symmetry.canonical_key(x, o)
+    entry = table.probe(key)
+    hash_cell = None
+    if (entry is not None):
+        value, flag, stored_cell = entry
+        if (flag == EXACT):
+            return value
+        if (flag == LOWER):
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if beta <= alpha:
+            return value
+        if (stored_cell is not None):
+            hash_cell = symmetry.transform_cell(stored_cell, symmetry.INVERSE[transform])
+
+    window_alpha = alpha
+    stats.expanded[ply] += 1
+    score = MIN_SCORE
+    best_cell = None
+    if (blocks):
+        stats.forced_blocks += 1
+        cells = STATIC_CELLS[blocks]
+    else:
+        cells = ordered_cells(x, o, empty, ply, 0, hash_cell, context)
+    for cell in cells:
+        value = context.min_value(x | BIT[cell], o, alpha, beta, context)
+        if (value > score):
+            score = value
+            best_cell = cell
+        alpha = max(alpha, score)
+        if beta <= alpha:
+            # alpha / beta pruning
+            context.cutoff(ply, 0, cell, POPCOUNT[empty])
+            break
+
+    table.store(key, score, bound_flag(score, window_alpha, beta), symmetry.transform_cell(best_cell, transform))
+    return score
+
+
+def min_value(x, o, alpha, beta, context):
+    """
+    Returns the score of a position with O to move.
+    """
+    empty = FULL ^ (x | o)
+    ply = 9 - POPCOUNT[empty]
+    stats = context.stats
+    stats.nodes[ply] += 1
+    if (WINNING[x]):
+        return 1 + POPCOUNT[empty]
+    if (WINNING[o]):
+        return -1 - POPCOUNT[empty]
+    if (not empty):
+        return 0
+
+    # tactics: a win now scores best, two threats cannot both be blocked, and one threat must be blocked
+    if (THREATS[o] & empty):
+        stats.immediate_wins += 1
+        return -POPCOUNT[empty]
+    blocks = THREATS[x] & empty
+    if (blocks & (blocks - 1)):
+        stats.forced_losses += 1
+        return POPCOUNT[empty] - 1
+
+    table = context.table
+    key, transform = symmetry.canonical_key(x, o)
+    entry = table.probe(key)
+    hash_cell = None
+    if (entry is not None):
+        value, flag, stored_cell = entry
+        if (flag == EXACT):
+            return value
+        if (flag == LOWER):
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if beta <= alpha:
+            return value
+        if (stored_cell is not None):
+            hash_cell = symmetry.transform_cell(stored_cell, symmetry.INVERSE[transform])
+
+    window_beta = beta
+    stats.expanded[ply] += 1
+    score = MAX_SCORE
+    best_cell = None
+    if (blocks):
+        stats.forced_blocks += 1
+        cells = STATIC_CELLS[blocks]
+    else:
+        cells = ordered_cells(o, x, empty, ply, 1, hash_cell, context)
+    for cell in cells:
+        value = context.max_value(x, o | BIT[cell], alpha, beta, context)
+        if (value < score):
+            score = value
+            best_cell = cell
+        beta = min(beta, score)
+        if beta <= alpha:
+            # alpha / beta pruning
+            context.cutoff(ply, 1, cell, POPCOUNT[empty])
+            break
+
+    table.store(key, score, bound_flag(score, alpha, window_beta), symmetry.transform_cell(best_cell, transform))
+    return score
+
+
+def bound_flag(score, alpha, beta):
+    """
+    Returns the transposition table flag for a score searched with window (alpha, beta).
+    """
+    if (score <= alpha):
+        return UPPER
+    elif (score >= beta):
+        return LOWER
+    else:
+        return EXACT
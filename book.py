@@ -0,0 +1,165 @@
+"""
+Perfect play solution table
+
+Every reachable position is solved once and written to a binary file, so the AI can answer any position with a single
+array read instead of a tree search.
+
+File layout (little endian):
+    header:  magic b"TTTS", format version (uint16), entry count (uint32), CRC32 of the entries (uint32)
+    entries: one uint16 per position, indexed by the base 3 encoding of the board
+             (cell (i, j) is digit i * 3 + j; 0 empty, 1 X, 2 O)
+
+Entry bits:
+    0 - 8   mask of the optimal cells for the player to move (cell (i, j) is bit i * 3 + j)
+    9 - 10  game theoretic value + 1 (0: O wins, 1: tie, 2: X wins)
+    15      set if the position is reachable and not terminal; all other bits are zero otherwise
+
+Optimal cells win as quickly as possible, or lose as slowly as possible.
+
+Run this module to regenerate the table:
+    python book.py [path]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+import bitboard
+from bitboard import BIT, CELLS, FULL, POPCOUNT, TERNARY
+from transposition import TranspositionTable
+
+MAGIC = b"TTTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHII")
+ENTRY = struct.Struct("<H")
+POSITIONS = 3 ** 9
+
+VALID = 1 << 15
+VALUE_SHIFT = 9
+MOVES_MASK = FULL
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solution.bin")
+
+def position_index(x, o):
+    """
+    Returns the base 3 index of a position.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+class SolutionTable:
+    """
+    Read-only view of a solution table file, memory mapped.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.verify()
+        except ValueError:
+            self.data.close()
+            raise
+
+    def verify(self):
+        """
+        Raises ValueError if the mapped file is not a complete, uncorrupted solution table.
+        """
+        if (len(self.data) != HEADER.size + POSITIONS * ENTRY.size):
+            raise ValueError(f"Invalid solution table size: {len(self.data)}")
+        magic, version, count, crc = HEADER.unpack_from(self.data, 0)
+        if (magic != MAGIC or version != VERSION or count != POSITIONS):
+            raise ValueError(f"Invalid solution table header: {magic!r} version {version} count {count}")
+        if (zlib.crc32(self.data[HEADER.size:]) != crc):
+            raise ValueError("Solution table checksum mismatch")
+
+    def close(self):
+        self.data.close()
+
+    def lookup(self, x, o):
+        """
+        Returns (value, cells_mask) for a reachable, non-terminal position, None otherwise.
+        """
+        entry = ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * position_index(x, o))[0]
+        if (not entry & VALID):
+            return None
+        return ((entry >> VALUE_SHIFT) & 0b11) - 1, entry & MOVES_MASK
+
+    def best_cell(self, x, o):
+        """
+        Returns an optimal cell for a reachable, non-terminal position, None otherwise.
+        """
+        entry = ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * position_index(x, o))[0]
+        if (not entry & VALID):
+            return None
+        return CELLS[entry & MOVES_MASK][0]
+
+
+def load(path=DEFAULT_PATH):
+    """
+    Returns the SolutionTable at path, or None if the file is missing or corrupt.
+    """
+    try:
+        return SolutionTable(path)
+    except (OSError, ValueError):
+        return None
+
+
+_default_table = None
+_default_loaded = False
+
+
+def default_table():
+    """
+    Returns the SolutionTable shipped with the engine, loading it on first use, or None if it is unavailable.
+    """
+    global _default_table, _default_loaded
+    if (not _default_loaded):
+        _default_table = load(DEFAULT_PATH)
+        _default_loaded = True
+    return _default_table
+
+
+def solve():
+    """
+    Returns the list of table entries for every position.
+    """
+    entries = [0] * POSITIONS
+    table = TranspositionTable(capacity=POSITIONS)
+    pending = [(0, 0)]
+    seen = {0}
+    while pending:
+        x, o = pending.pop()
+        scores = bitboard.analyse(x, o, table)
+        if (not scores):
+            continue
+        x_to_move = POPCOUNT[x] == POPCOUNT[o]
+        best = max(score for _, score in scores) if x_to_move else min(score for _, score in scores)
+        cells_mask = 0
+        for cell, score in scores:
+            if (score == best):
+                cells_mask |= BIT[cell]
+            child = (x | BIT[cell], o) if x_to_move else (x, o | BIT[cell])
+            child_key = child[0] | (child[1] << 9)
+            if (child_key not in seen):
+                seen.add(child_key)
+                pending.append(child)
+        value = bitboard.score_value(best)
+        entries[position_index(x, o)] = VALID | ((value + 1) << VALUE_SHIFT) | cells_mask
+    return entries
+
+
+def generate(path=DEFAULT_PATH):
+    """
+    Solves every reachable position and writes the solution table to path.
+    """
+    payload = struct.pack(f"<{POSITIONS}H", *solve())
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, POSITIONS, zlib.crc32(payload)))
+        file.write(payload)
+
+
+if __name__ == "__main__":
+    generate(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
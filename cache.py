@@ -0,0 +1,162 @@
+"""
+Persistent position cache
+
+Transposition table entries of the bitboard engine are kept in an SQLite database between runs, so a process can
+start with the results of earlier searches instead of recomputing them. Entries are keyed like the transposition
+table, by the position key of the canonical orientation of the board.
+
+The database is in write-ahead logging mode, so any number of processes can read it while one writes. Readers open
+it read-only and never create or change it.
+
+The database records a fingerprint of the cache format version, the win lines and the symmetries. If the fingerprint
+changes, its entries were scored or keyed by other rules: readers ignore them, and the next writer deletes them.
+"""
+
+import hashlib
+import os
+import pathlib
+import sqlite3
+
+import bitboard
+import symmetry
+from transposition import EXACT
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "positions.db")
+
+# Version of the cached entries. Bump it by hand whenever a change alters the values the search stores (the scoring in
+# bitboard.utility, search_root, max_value, min_value and bound_flag) or how entries are keyed and oriented
+# (bitboard.position_key, symmetry.canonical_key and symmetry.transform_cell).
+VERSION = 1
+
+# seconds to wait for another process's write to finish
+TIMEOUT = 30
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS positions "
+    "(key INTEGER PRIMARY KEY, value INTEGER NOT NULL, flag INTEGER NOT NULL, best_move INTEGER)",
+)
+
+# an exact entry is never replaced by a bound
+UPSERT = (
+    "INSERT INTO positions (key, value, flag, best_move) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, flag = excluded.flag, best_move = excluded.best_move "
+    f"WHERE excluded.flag = {EXACT} OR positions.flag != {EXACT}"
+)
+
+
+def fingerprint(version=VERSION):
+    """
+    Returns a hex digest of the cache version, the win lines and the symmetry permutations.
+    """
+    return hashlib.sha256(repr((version, bitboard.WIN_MASKS, symmetry.PERMUTATIONS)).encode()).hexdigest()
+
+
+class PositionCache:
+    """
+    Connection to a position cache database, read-only unless writable.
+    Opening a missing database read-only raises sqlite3.OperationalError.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, writable=False, version=None):
+        self.path = path
+        self.version = fingerprint() if version is None else version
+        if (writable):
+            self.connection = sqlite3.connect(path, timeout=TIMEOUT)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            with self.connection:
+                for statement in SCHEMA:
+                    self.connection.execute(statement)
+                if (self.stored_version() != self.version):
+                    self.connection.execute("DELETE FROM positions")
+                    self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        else:
+            uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True, timeout=TIMEOUT)
+        self.current = self.stored_version() == self.version
+
+    def stored_version(self):
+        """
+        Returns the fingerprint the entries were stored with, or None for a new database.
+        """
+        try:
+            row = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        if (not self.current):
+            return 0
+        return self.connection.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def get(self, key):
+        """
+        Returns the (value, flag, best_move) entry for key, or None if there is no current entry.
+        """
+        if (not self.current):
+            return None
+        return self.connection.execute(
+            "SELECT value, flag, best_move FROM positions WHERE key = ?", (key,)).fetchone()
+
+    def load(self, table):
+        """
+        Stores every entry into the TranspositionTable table, keeping exact entries it already has.
+        Returns the number of entries stored.
+        """
+        if (not self.current):
+            return 0
+        loaded = 0
+        for key, value, flag, best_move in self.connection.execute("SELECT key, value, flag, best_move FROM positions"):
+            entry = table.peek(key)
+            if (entry is None or entry[1] != EXACT or flag == EXACT):
+                table.store(key, value, flag, best_move)
+                loaded += 1
+        return loaded
+
+    def save(self, table):
+        """
+        Writes every entry of the TranspositionTable table in one transaction, keeping exact entries already stored.
+        Returns the number of entries written.
+        """
+        rows = [(key, value, flag, best_move) for key, (value, flag, best_move) in table.entries.items()]
+        with self.connection:
+            self.connection.executemany(UPSERT, rows)
+        return len(rows)
+
+
+def warm(table=None, path=DEFAULT_PATH):
+    """
+    Loads the cache at path into table, by default the engine's shared table.
+    Returns the number of entries loaded: 0 if the cache is missing, unreadable or out of date.
+    """
+    try:
+        cache = PositionCache(path)
+    except (sqlite3.Error, OSError):
+        return 0
+    try:
+        return cache.load(bitboard.TABLE if table is None else table)
+    except (sqlite3.Error, OSError):
+        return 0
+    finally:
+        cache.close()
+
+
+def save(table=None, path=DEFAULT_PATH):
+    """
+    Writes table, by default the engine's shared table, to the cache at path, creating it if needed.
+    Returns the number of entries written, or 0 if the cache could not be written.
+    """
+    try:
+        cache = PositionCache(path, writable=True)
+    except (sqlite3.Error, OSError):
+        return 0
+    try:
+        return cache.save(bitboard.TABLE if table is None else table)
+    except (sqlite3.Error, OSError):
+        return 0
+    finally:
+        cache.close()
@@ -0,0 +1,191 @@
+"""
+Game tree enumeration and statistics for m,n,k games
+
+The tree is walked lazily by generators that make and unmake moves on a single State, so memory use grows only with
+the depth of the tree, never with the number of games. Positions can be deduplicated with a VisitedBitmap, one bit
+per base 3 board index, which is a fixed size for a given board.
+
+    python gametree.py                      statistics of the Tic Tac Toe tree
+    python gametree.py --games              one line per finished game: its moves and its result
+    python gametree.py --positions          one line per unique position
+    python gametree.py -m 4 -n 4 -k 4 --max-plies 6 --output tree.txt
+
+For Tic Tac Toe there are 255,168 games (131,184 won by X, 77,904 by O and 46,080 drawn) and 5,478 unique positions,
+958 of them terminal.
+"""
+
+import argparse
+import json
+import sys
+
+import mnk
+from bitboard import X, O, EMPTY
+
+# beyond 16 cells a visited bitmap no longer fits in memory
+MAX_BITMAP_CELLS = 16
+
+DIGITS = {EMPTY: 0, X: 1, O: 2}
+
+TOKENS = {EMPTY: ".", X: X, O: O}
+
+
+class VisitedBitmap:
+    """
+    Set of positions of a board with size cells, one bit per base 3 board index.
+    """
+
+    def __init__(self, size):
+        if (size > MAX_BITMAP_CELLS):
+            raise ValueError(f"Too many cells for a visited bitmap: {size}")
+        self.bits = bytearray((3 ** size + 7) // 8)
+
+    def __contains__(self, index):
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def add(self, index):
+        """
+        Adds the position index, and returns True if it was not already in the set.
+        """
+        bit = 1 << (index & 7)
+        byte = index >> 3
+        if (self.bits[byte] & bit):
+            return False
+        self.bits[byte] |= bit
+        return True
+
+
+def position_index(state):
+    """
+    Returns the base 3 index of a state, with cell c as digit c (0 empty, 1 X, 2 O).
+    """
+    index = 0
+    for cell in reversed(state.cells):
+        index = index * 3 + DIGITS[cell]
+    return index
+
+
+def walk(state, max_plies=None, visited=None):
+    """
+    Yields state at each node of the game tree below it in depth first order, starting with state itself.
+    The same State object is yielded every time, moved to the node, and must not be changed by the caller.
+    With max_plies, nodes more than max_plies moves below state are not visited. With a VisitedBitmap, positions
+    already in it are skipped along with the trees below them, so each position is yielded once.
+    """
+    index = position_index(state) if visited is not None else 0
+    if (visited is not None and not visited.add(index)):
+        return
+    yield state
+    if (state.terminal() or max_plies == 0):
+        return
+
+    powers = [3 ** cell for cell in range(state.game.size)]
+    root_length = len(state.history)
+    # one (unexplored moves, position index) pair per node on the path from state
+    stack = [(iter(state.actions()), index)]
+    while stack:
+        moves, index = stack[-1]
+        cell = next(moves, None)
+        if (cell is None):
+            stack.pop()
+            if (len(state.history) > root_length):
+                state.unmake()
+            continue
+        child_index = index + (1 if len(state.history) % 2 == 0 else 2) * powers[cell]
+        if (visited is not None and not visited.add(child_index)):
+            continue
+        state.make(cell)
+        yield state
+        if (state.terminal() or (max_plies is not None and len(state.history) - root_length >= max_plies)):
+            state.unmake()
+        else:
+            stack.append((iter(state.actions()), child_index))
+
+
+def games(state, max_plies=None):
+    """
+    Yields (moves, winner) for every finished game below state, where moves is the tuple of cells played from the
+    empty board and winner is X, O or None for a draw.
+    """
+    for node in walk(state, max_plies):
+        if (node.terminal()):
+            yield tuple(node.history), node.winner
+
+
+def positions(state, max_plies=None):
+    """
+    Yields every unique position below state once, as a string of X, O and . for each cell.
+    """
+    for node in walk(state, max_plies, VisitedBitmap(state.game.size)):
+        yield "".join(TOKENS[cell] for cell in node.cells)
+
+
+def statistics(game, max_plies=None, dedupe=True):
+    """
+    Returns a dict of statistics of the game tree of game: the number of games won by each player and drawn, the
+    number of unfinished lines of play cut off at max_plies and, with dedupe, the number of unique positions at
+    each ply and the number of unique terminal positions with each outcome.
+    """
+    results = {"game": repr(game), "max_plies": max_plies}
+    outcomes = {X: 0, O: 0, None: 0}
+    unfinished = 0
+    for node in walk(game.new_state(), max_plies):
+        if (node.terminal()):
+            outcomes[node.winner] += 1
+        elif (max_plies is not None and len(node.history) == max_plies):
+            unfinished += 1
+    results["games"] = sum(outcomes.values())
+    results["x_wins"] = outcomes[X]
+    results["o_wins"] = outcomes[O]
+    results["draws"] = outcomes[None]
+    results["unfinished"] = unfinished
+
+    if (dedupe):
+        per_ply = [0] * (game.size + 1)
+        terminal = {X: 0, O: 0, None: 0}
+        for node in walk(game.new_state(), max_plies, VisitedBitmap(game.size)):
+            per_ply[len(node.history)] += 1
+            if (node.terminal()):
+                terminal[node.winner] += 1
+        results["positions"] = sum(per_ply)
+        results["positions_per_ply"] = per_ply
+        results["terminal_positions"] = sum(terminal.values())
+        results["terminal_x_wins"] = terminal[X]
+        results["terminal_o_wins"] = terminal[O]
+        results["terminal_draws"] = terminal[None]
+    return results
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Enumerate the game tree of an m,n,k game.")
+    parser.add_argument("-m", type=int, default=3, help="rows")
+    parser.add_argument("-n", type=int, default=3, help="columns")
+    parser.add_argument("-k", type=int, default=3, help="stones in a row to win")
+    parser.add_argument("--max-plies", type=int, help="stop this many moves into the game")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="skip the unique position statistics, always skipped beyond 16 cells")
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--games", action="store_true", help="write every finished game")
+    mode.add_argument("--positions", action="store_true", help="write every unique position")
+    options = parser.parse_args(arguments)
+
+    game = mnk.Game(options.m, options.n, options.k)
+    output = open(options.output, "w") if options.output else sys.stdout
+    try:
+        if (options.games):
+            for moves, winner in games(game.new_state(), options.max_plies):
+                output.write(f"{' '.join(map(str, moves))} {winner or 'draw'}\n")
+        elif (options.positions):
+            for position in positions(game.new_state(), options.max_plies):
+                output.write(position + "\n")
+        else:
+            dedupe = not options.no_dedupe and game.size <= MAX_BITMAP_CELLS
+            json.dump(statistics(game, options.max_plies, dedupe), output, indent=2)
+            output.write("\n")
+    finally:
+        if (output is not sys.stdout):
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Load generator for the engine server
+
+Opens a number of concurrent connections to server.py, each sending solve requests one after another for positions
+drawn from a pool of random reachable positions, and reports the requests per second and the p50 / p99 round trip
+and server latencies. With no address, a server is started in this process for the run.
+
+    python loadgen.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--connections 20] [--requests 100]
+    python loadgen.py --local
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import server
+import tictactoe as ttt
+
+
+def random_positions(count, rng):
+    """
+    Returns count boards reached by random play, none of them finished.
+    """
+    positions = []
+    while len(positions) < count:
+        board = ttt.initial_state()
+        for _ in range(rng.randrange(9)):
+            board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+            if (ttt.terminal(board)):
+                break
+        if (not ttt.terminal(board)):
+            positions.append(board)
+    return positions
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at fraction of the way through the sorted values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def client(connect, positions, requests, rng, round_trips, latencies):
+    """
+    Sends requests solve requests over one connection, waiting for each response before the next request.
+    """
+    reader, writer = await connect()
+    try:
+        for index in range(requests):
+            board = rng.choice(positions)
+            start = time.perf_counter()
+            writer.write(json.dumps({"op": "solve", "id": index, "board": board}).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            round_trips.append(time.perf_counter() - start)
+            if (not response.get("ok")):
+                raise Exception(f"Request failed: {response}")
+            latencies.append(response["latency"])
+    finally:
+        writer.close()
+
+
+async def run(connect, connections=20, requests=100, pool=50, seed=None):
+    """
+    Runs the load and returns a dict of the requests sent, seconds, requests per second, and p50 / p99 of the
+    round trip and server latencies in seconds.
+    """
+    rng = random.Random(seed)
+    positions = random_positions(pool, rng)
+    round_trips = []
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(connect, positions, requests, random.Random(rng.random()), round_trips, latencies)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(round_trips),
+        "seconds": elapsed,
+        "requests_per_second": len(round_trips) / elapsed,
+        "round_trip_p50": percentile(round_trips, 0.50),
+        "round_trip_p99": percentile(round_trips, 0.99),
+        "server_p50": percentile(latencies, 0.50),
+        "server_p99": percentile(latencies, 0.99),
+    }
+
+
+async def run_local(connections=20, requests=100, pool=50, seed=None):
+    """
+    Runs the load against a server started on a free local port, and returns (results, server stats).
+    """
+    engine_server = server.Server()
+    listener = await engine_server.start(port=0)
+    host, port = listener.sockets[0].getsockname()[:2]
+    try:
+        results = await run(lambda: asyncio.open_connection(host, port), connections, requests, pool, seed)
+    finally:
+        listener.close()
+        await listener.wait_closed()
+    return results, {"searches": engine_server.searches, "coalesced": engine_server.coalesced}
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Measure the latency and throughput of the engine server.")
+    parser.add_argument("--host", default=server.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--local", action="store_true", help="start a server in this process for the run")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100, help="requests per connection")
+    parser.add_argument("--pool", type=int, default=50, help="number of distinct positions requested")
+    parser.add_argument("--seed", type=int)
+    options = parser.parse_args(arguments)
+
+    if (options.local):
+        results, stats = asyncio.run(run_local(options.connections, options.requests, options.pool, options.seed))
+        results.update(stats)
+    else:
+        if (options.unix):
+            connect = lambda: asyncio.open_unix_connection(options.unix)
+        else:
+            connect = lambda: asyncio.open_connection(options.host, options.port)
+        results = asyncio.run(run(connect, options.connections, options.requests, options.pool, options.seed))
+
+    print(f"{results['requests']} requests in {results['seconds']:.2f} s, "
+          f"{results['requests_per_second']:.0f} requests/s")
+    print(f"round trip  p50 {results['round_trip_p50'] * 1000:.3f} ms  p99 {results['round_trip_p99'] * 1000:.3f} ms")
+    print(f"server      p50 {results['server_p50'] * 1000:.3f} ms  p99 {results['server_p99'] * 1000:.3f} ms")
+    if ("searches" in results):
+        print(f"{results['searches']} searches, {results['coalesced']} requests coalesced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Monte Carlo tree search (UCT) for m,n,k games
+
+Instead of searching every move to the end, the engine grows a tree of the most promising lines: each step walks
+down the tree choosing moves by the UCT formula, adds one new node, plays a batch of random games (playouts) from it
+and counts their results back up the path. The most visited move at the root is played.
+
+A search is budgeted in tree steps, not playouts: a batch makes each step's statistics less noisy, but only more steps
+grow the tree, and on large boards the tree has to reach every reply before it can tell a forced move from the rest.
+
+With NumPy, the playouts of a batch run together as arrays, one row per playout: each row fills the empty cells in its
+own random order, and every step plays one move in all rows at once, updating the stone counts of only the lines
+through the cells played. Without NumPy they run one by one on the State with make / unmake.
+
+An MCTS engine keeps its tree between calls: when the next position is the current root plus moves already in the
+tree, the subtree under those moves becomes the new root and its statistics are kept.
+
+    python mcts.py [m n k steps]
+"""
+
+import math
+import random
+import sys
+import time
+
+import mnk
+from bitboard import X, O, EMPTY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# number of playouts at each leaf: with NumPy a batch runs as cheaply as a few single playouts, without it every
+# playout costs the same, so batches are kept small
+DEFAULT_BATCH = 64
+SERIAL_BATCH = 8
+
+# tree steps of a search
+DEFAULT_STEPS = 500
+
+EXPLORATION = math.sqrt(2)
+
+
+class Node:
+    """
+    Node of the search tree: the position after mover played cell. reward is the total over its playouts of
+    1 for a win for mover, 0.5 for a draw and 0 for a loss.
+    """
+
+    __slots__ = ("cell", "mover", "children", "untried", "visits", "reward")
+
+    def __init__(self, cell, mover, untried):
+        self.cell = cell
+        self.mover = mover
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.reward = 0.0
+
+    def select(self, exploration):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        best = None
+        best_bound = -1.0
+        for child in self.children.values():
+            bound = child.reward / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if (bound > best_bound):
+                best = child
+                best_bound = bound
+        return best
+
+
+class MCTS:
+    """
+    UCT search engine for one m,n,k game, keeping its tree between searches.
+    With vectorised, playouts run in NumPy batches of batch playouts, by default DEFAULT_BATCH, when NumPy is
+    available; otherwise they run one by one, SERIAL_BATCH at each leaf by default.
+    """
+
+    def __init__(self, game, batch=None, exploration=EXPLORATION, seed=None, vectorised=True):
+        self.game = game
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.vectorised = vectorised and np is not None
+        if (batch is None):
+            batch = DEFAULT_BATCH if self.vectorised else SERIAL_BATCH
+        self.batch = batch
+        if (self.vectorised):
+            self.np_rng = np.random.default_rng(seed)
+            # cell_lines[cell] holds the lines through cell, padded with the index one past the last line
+            most = max(len(lines) for lines in game.cell_lines)
+            self.cell_lines = np.array([list(lines) + [len(game.lines)] * (most - len(lines))
+                                        for lines in game.cell_lines], dtype=np.intp)
+        self.root = None
+        self.root_cells = None
+        # playouts and seconds of the last search
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def playouts_per_second(self):
+        """
+        Returns the playout rate of the last search.
+        """
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def new_node(self, state, cell, mover):
+        """
+        Returns a node for state, reached by mover playing cell, with its moves to try in random order.
+        """
+        untried = [] if state.terminal() else state.actions()
+        self.rng.shuffle(untried)
+        return Node(cell, mover, untried)
+
+    def advance(self, state):
+        """
+        Makes the node for state the root, reusing the subtree under it if state follows from the current root by
+        moves already in the tree, and returns True if it did.
+        """
+        cells = tuple(state.cells)
+        if (self.root is not None and self.root_cells is not None):
+            added = {}
+            for cell, (before, after) in enumerate(zip(self.root_cells, cells)):
+                if (before != after):
+                    if (before != EMPTY):
+                        break
+                    added[cell] = after
+            else:
+                node = self._descend(self.root, added)
+                if (node is not None):
+                    self.root = node
+                    self.root_cells = cells
+                    return True
+        mover = O if len(state.history) % 2 == 0 else X
+        self.root = self.new_node(state, None, mover)
+        self.root_cells = cells
+        return False
+
+    def _descend(self, node, added):
+        """
+        Returns the node reached from node by playing the stones of added, in some order, through existing children.
+        """
+        if (not added):
+            return node
+        stone = X if node.mover == O else O
+        for cell, added_stone in added.items():
+            child = node.children.get(cell)
+            if (added_stone == stone and child is not None):
+                found = self._descend(child, {other: other_stone for other, other_stone in added.items()
+                                              if other != cell})
+                if (found is not None):
+                    return found
+        return None
+
+    def search(self, state, steps=DEFAULT_STEPS, time_limit=None):
+        """
+        Returns the most visited cell at the root after steps tree steps of batch playouts each, or time_limit
+        seconds if that comes first, or None if the game is over. With steps None, only time_limit stops the search.
+        The state is left as it was found.
+        """
+        if (state.terminal()):
+            return None
+        self.advance(state)
+        root = self.root
+        root_length = len(state.history)
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        start = time.perf_counter()
+        done = 0
+        step = 0
+        while (steps is None or step < steps):
+            if (deadline is not None and time.perf_counter() > deadline):
+                break
+            # selection
+            node = root
+            path = [node]
+            while (not node.untried and node.children):
+                node = node.select(self.exploration)
+                state.make(node.cell)
+                path.append(node)
+            # expansion
+            if (node.untried):
+                cell = node.untried.pop()
+                mover = X if len(state.history) % 2 == 0 else O
+                state.make(cell)
+                child = self.new_node(state, cell, mover)
+                node.children[cell] = child
+                node = child
+                path.append(node)
+            # simulation
+            count = self.batch
+            x_wins, o_wins, draws = self.rollouts(state, count)
+            done += count
+            step += 1
+            # backpropagation
+            for node in path:
+                node.visits += count
+                node.reward += (x_wins if node.mover == X else o_wins) + 0.5 * draws
+            while (len(state.history) > root_length):
+                state.unmake()
+        self.playouts = done
+        self.elapsed = time.perf_counter() - start
+        if (not root.children):
+            return state.actions()[0]
+        return max(root.children.values(), key=lambda child: child.visits).cell
+
+    def rollouts(self, state, count):
+        """
+        Returns (X wins, O wins, draws) of count random playouts from state.
+        """
+        if (state.terminal()):
+            if (state.winner == X):
+                return count, 0, 0
+            if (state.winner == O):
+                return 0, count, 0
+            return 0, 0, count
+        if (self.vectorised):
+            return self._rollouts_numpy(state, count)
+        outcomes = {X: 0, O: 0, None: 0}
+        root_length = len(state.history)
+        for _ in range(count):
+            actions = state.actions()
+            self.rng.shuffle(actions)
+            for cell in actions:
+                state.make(cell)
+                if (state.winner is not None):
+                    break
+            outcomes[state.winner] += 1
+            while (len(state.history) > root_length):
+                state.unmake()
+        return outcomes[X], outcomes[O], outcomes[None]
+
+    def _rollouts_numpy(self, state, count):
+        """
+        Returns (X wins, O wins, draws) of count random playouts from state, played together as arrays.
+        """
+        empty_cells = np.array(state.actions(), dtype=np.intp)
+        # every playout fills the empty cells in its own random order
+        orders = empty_cells[np.argsort(self.np_rng.random((count, len(empty_cells))), axis=1)]
+        # stones of each player in every line of every playout, plus a padding line that is reset every step
+        padding = len(self.game.lines)
+        counts = np.zeros((2, count, padding + 1), dtype=np.int8)
+        counts[0, :, :padding] = state.counts[X]
+        counts[1, :, :padding] = state.counts[O]
+        winners = np.zeros(count, dtype=np.int8)
+        rows = np.arange(count)[:, None]
+        k = self.game.k
+        digit = 1 if len(state.history) % 2 == 0 else 2
+        for step in range(len(empty_cells)):
+            # only the lines through the cell just played change
+            lines = self.cell_lines[orders[:, step]]
+            player_counts = counts[digit - 1]
+            line_counts = player_counts[rows, lines] + 1
+            player_counts[rows, lines] = line_counts
+            player_counts[:, padding] = 0
+            won = (line_counts == k).any(axis=1)
+            winners[won & (winners == 0)] = digit
+            digit = 3 - digit
+        x_wins = int(np.count_nonzero(winners == 1))
+        o_wins = int(np.count_nonzero(winners == 2))
+        return x_wins, o_wins, count - x_wins - o_wins
+
+
+def throughput_report(game, steps):
+    """
+    Prints the playouts per second of a search of the empty board, with and without NumPy batches.
+    """
+    print(f"{game!r}, {steps} tree steps from the empty board")
+    for label, vectorised in (("numpy batches", True), ("one by one", False)):
+        if (vectorised and np is None):
+            continue
+        engine = MCTS(game, vectorised=vectorised, seed=0)
+        cell = engine.search(game.new_state(), steps)
+        print(f"{label:<14} cell {cell:>3}  {engine.elapsed:>7.3f} s  {engine.playouts_per_second():>9.0f} playouts/s")
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) == 5):
+        m, n, k, steps = (int(argument) for argument in sys.argv[1:])
+    else:
+        m, n, k, steps = 3, 3, 3, 2000
+    throughput_report(mnk.Game(m, n, k), steps)
@@ -0,0 +1,155 @@
+"""
+Micro-benchmark: copying search vs make / unmake search
+
+Runs the same alpha / beta search, visiting children in the same order, two ways:
+    copy         every node deep copies a list-of-lists board to play a move and rescans it for the mover, the moves
+                 and the winner, as the original list-board functions did
+    make/unmake  every node plays and takes back a move on one mnk.State, with the move count passed down
+Both visit the same nodes, so nodes per second compares the per node cost directly.
+
+    python microbench.py [repeats]
+"""
+
+import copy
+import sys
+import time
+
+import search
+import tictactoe as ttt
+from bitboard import X, O, EMPTY, MIN_SCORE, MAX_SCORE
+
+POSITIONS = (
+    ("empty board", ttt.initial_state()),
+    ("one move", [[EMPTY, EMPTY, EMPTY],
+                  [EMPTY, X, EMPTY],
+                  [EMPTY, EMPTY, EMPTY]]),
+    ("midgame", [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]),
+)
+
+
+# cells of each win line
+LINES = tuple(tuple((i, j) for j in range(3)) for i in range(3)) + \
+    tuple(tuple((i, j) for i in range(3)) for j in range(3)) + \
+    (((0, 0), (1, 1), (2, 2)), ((0, 2), (1, 1), (2, 0)))
+
+
+# the copying search uses its own list-board functions, which scan the whole board on every call as the original
+# tictactoe functions did, so that it measures the per node cost make / unmake replaced
+
+def copy_player(board):
+    count_x = sum(1 for row in board for cell in row if cell == X)
+    count_o = sum(1 for row in board for cell in row if cell == O)
+    return O if count_x > count_o else X
+
+
+def copy_actions(board):
+    return {(i, j) for i in range(3) for j in range(3) if board[i][j] == EMPTY}
+
+
+def copy_result(board, action):
+    new_board = copy.deepcopy(board)
+    new_board[action[0]][action[1]] = copy_player(board)
+    return new_board
+
+
+def copy_winner(board):
+    for stone in (X, O):
+        for line in LINES:
+            if (all(board[i][j] == stone for i, j in line)):
+                return stone
+    return None
+
+
+def copy_terminal(board):
+    return copy_winner(board) is not None or all(cell != EMPTY for row in board for cell in row)
+
+
+def copy_score(board):
+    winning_player = copy_winner(board)
+    utility = 1 if winning_player == X else (-1 if winning_player == O else 0)
+    empty = sum(1 for row in board for cell in row if cell == EMPTY)
+    return utility * (1 + empty)
+
+
+def copy_max_value(board, alpha, beta, counter):
+    counter[0] += 1
+    if copy_terminal(board):
+        return copy_score(board)
+    score = MIN_SCORE
+    for action in sorted(copy_actions(board)):
+        score = max(score, copy_min_value(copy_result(board, action), alpha, beta, counter))
+        alpha = max(alpha, score)
+        if beta <= alpha:
+            break
+    return score
+
+
+def copy_min_value(board, alpha, beta, counter):
+    counter[0] += 1
+    if copy_terminal(board):
+        return copy_score(board)
+    score = MAX_SCORE
+    for action in sorted(copy_actions(board)):
+        score = min(score, copy_max_value(copy_result(board, action), alpha, beta, counter))
+        beta = min(beta, score)
+        if beta <= alpha:
+            break
+    return score
+
+
+def copy_search(board):
+    """
+    Returns (score, nodes) of the copying search.
+    """
+    counter = [0]
+    if (copy_player(board) == X):
+        score = copy_max_value(board, MIN_SCORE, MAX_SCORE, counter)
+    else:
+        score = copy_min_value(board, MIN_SCORE, MAX_SCORE, counter)
+    return score, counter[0]
+
+
+def make_unmake_search(board):
+    """
+    Returns (score, nodes) of the make / unmake search.
+    """
+    state = ttt.GAME.new_state(board)
+    searcher = search.Search(state)
+    move_count = len(state.history)
+    if (move_count % 2 == 0):
+        score = searcher.max_value(move_count, ttt.GAME.size - move_count, MIN_SCORE, MAX_SCORE)
+    else:
+        score = searcher.min_value(move_count, ttt.GAME.size - move_count, MIN_SCORE, MAX_SCORE)
+    return score, searcher.nodes
+
+
+def measure(function, board, repeats):
+    """
+    Returns (score, nodes, best seconds) of repeats runs of function on board.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        score, nodes = function(board)
+        elapsed = time.perf_counter() - start
+        if (best is None or elapsed < best):
+            best = elapsed
+    return score, nodes, best
+
+
+def main(repeats=3):
+    print(f"{'position':<12} {'search':<12} {'nodes':>8} {'seconds':>9} {'nodes/s':>11}")
+    for name, board in POSITIONS:
+        results = []
+        for label, function in (("copy", copy_search), ("make/unmake", make_unmake_search)):
+            score, nodes, seconds = measure(function, board, repeats)
+            results.append((score, nodes))
+            print(f"{name:<12} {label:<12} {nodes:>8} {seconds:>9.4f} {nodes / seconds:>11.0f}")
+        if (results[0] != results[1]):
+            raise Exception(f"Searches disagree on {name}: {results}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
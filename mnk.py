@@ -0,0 +1,257 @@
+"""
+m,n,k game engine
+
+An m,n,k game is played on a board of m rows and n columns. Players take turns to place a stone, and the first to
+get k stones in a row horizontally, vertically or diagonally wins. Tic Tac Toe is the 3,3,3 game, and gomoku the
+15,15,5 game.
+
+Every run of k cells a player could win with is a line. A State keeps a count of each player's stones in every line,
+updated as moves are made and unmade, so detecting a win only looks at the lines through the cell just played instead
+of rescanning the board.
+
+A State also keeps a Zobrist hash of its position: every (cell, stone) pair has a random 64 bit key, and the hash is
+the XOR of the keys of the stones on the board, so playing or taking back a move updates it with a single XOR.
+With track_symmetries(), a State keeps one hash per symmetry of the board, of the position as that symmetry maps it;
+the smallest is the same for every position in a symmetry class, and serves as its canonical key.
+"""
+
+import random
+
+from bitboard import X, O, EMPTY
+
+# (row step, col step) of the four line directions: across, down, down-right and down-left
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# seed of the Zobrist keys, fixed so that hashes agree between processes and runs
+ZOBRIST_SEED = 0x7A0B
+
+
+class Game:
+    """
+    The rules of the m,n,k game: board dimensions and the lines through each cell.
+    Cells are numbered row by row, so action (i, j) is cell i * n + j.
+    """
+
+    def __init__(self, m, n, k):
+        if (m < 1 or n < 1 or k < 1 or k > max(m, n)):
+            raise ValueError(f"Invalid m,n,k game: {m},{n},{k}")
+        self.rows = m
+        self.cols = n
+        self.k = k
+        self.size = m * n
+
+        lines = []
+        for row_index in range(m):
+            for col_index in range(n):
+                for row_step, col_step in DIRECTIONS:
+                    end_row = row_index + row_step * (k - 1)
+                    end_col = col_index + col_step * (k - 1)
+                    if (0 <= end_row < m and 0 <= end_col < n):
+                        lines.append(tuple((row_index + row_step * step) * n + col_index + col_step * step
+                                           for step in range(k)))
+        self.lines = tuple(lines)
+
+        cell_lines = [[] for _ in range(self.size)]
+        for line_index, line in enumerate(self.lines):
+            for cell in line:
+                cell_lines[cell].append(line_index)
+        self.cell_lines = tuple(tuple(line_indexes) for line_indexes in cell_lines)
+
+        # symmetries[t][cell] is the cell that symmetry t maps cell to; symmetry 0 is the identity
+        maps = [lambda r, c: (r, c), lambda r, c: (m - 1 - r, n - 1 - c),
+                lambda r, c: (m - 1 - r, c), lambda r, c: (r, n - 1 - c)]
+        if (m == n):
+            maps += [lambda r, c: (c, r), lambda r, c: (n - 1 - c, m - 1 - r),
+                     lambda r, c: (c, m - 1 - r), lambda r, c: (n - 1 - c, r)]
+        self.symmetries = tuple(tuple(self.cell(mapping(*self.action(cell))) for cell in range(self.size))
+                                for mapping in maps)
+        self.inverse_symmetries = tuple(tuple(symmetry.index(cell) for cell in range(self.size))
+                                        for symmetry in self.symmetries)
+
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist = {stone: tuple(rng.getrandbits(64) for _ in range(self.size)) for stone in (X, O)}
+        # symmetric_zobrist[stone][cell][t] is the key of stone on the cell that symmetry t maps cell to
+        self.symmetric_zobrist = {stone: tuple(tuple(keys[symmetry[cell]] for symmetry in self.symmetries)
+                                               for cell in range(self.size))
+                                  for stone, keys in self.zobrist.items()}
+
+    def __repr__(self):
+        return f"Game({self.rows}, {self.cols}, {self.k})"
+
+    def cell(self, action):
+        """
+        Returns the cell index of action (i, j).
+        """
+        return action[0] * self.cols + action[1]
+
+    def action(self, cell):
+        """
+        Returns the action (i, j) of a cell index.
+        """
+        return divmod(cell, self.cols)
+
+    def initial_state(self):
+        """
+        Returns an empty list-of-lists board.
+        """
+        return [[EMPTY] * self.cols for _ in range(self.rows)]
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on a list-of-lists board.
+        """
+        possible_actions = set()
+        for row_index in range(self.rows):
+            for col_index in range(self.cols):
+                if (board[row_index][col_index] == EMPTY):
+                    possible_actions.add((row_index, col_index))
+        return possible_actions
+
+    def winner(self, board):
+        """
+        Returns the winner of a list-of-lists board, if there is one, by checking every line.
+        """
+        cells = [cell for row in board for cell in row]
+        for line in self.lines:
+            first = cells[line[0]]
+            if (first != EMPTY and all(cells[cell] == first for cell in line)):
+                return first
+        return None
+
+    def new_state(self, board=None):
+        """
+        Returns a State for a list-of-lists board, or for the empty board.
+        """
+        state = State(self)
+        if (board is not None):
+            for row_index, row in enumerate(board):
+                for col_index, cell in enumerate(row):
+                    if (cell != EMPTY):
+                        state.place(row_index * self.cols + col_index, cell)
+        return state
+
+
+class State:
+    """
+    Mutable position of an m,n,k game with incremental win detection.
+    make() and unmake() update the stones, move history and line counts in place.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.cells = [EMPTY] * game.size
+        self.history = []
+        self.counts = {X: [0] * len(game.lines), O: [0] * len(game.lines)}
+        self.winner = None
+        # number of stones on the board when the winner completed their first line
+        self.win_length = None
+        self.hash = 0
+        # hash of the position under each symmetry, kept once track_symmetries() is called
+        self.hashes = None
+
+    def __repr__(self):
+        return f"State({self.game!r}, {self.to_board()!r})"
+
+    def player(self):
+        """
+        Returns player who has the next turn.
+        """
+        if (len(self.history) % 2 == 0):
+            return X
+        else:
+            return O
+
+    def actions(self):
+        """
+        Returns the list of empty cells.
+        """
+        cells = self.cells
+        return [cell for cell in range(self.game.size) if cells[cell] == EMPTY]
+
+    def terminal(self):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.winner is not None or len(self.history) == self.game.size
+
+    def utility(self):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        if (self.winner == X):
+            return 1
+        elif (self.winner == O):
+            return -1
+        else:
+            return 0
+
+    def place(self, cell, stone):
+        """
+        Places stone on an empty cell and updates the counts of the lines through it.
+        """
+        self.cells[cell] = stone
+        self.history.append(cell)
+        self.hash ^= self.game.zobrist[stone][cell]
+        if (self.hashes is not None):
+            self.hashes = [position_hash ^ key for position_hash, key
+                           in zip(self.hashes, self.game.symmetric_zobrist[stone][cell])]
+        counts = self.counts[stone]
+        k = self.game.k
+        for line in self.game.cell_lines[cell]:
+            counts[line] += 1
+            if (counts[line] == k and self.winner is None):
+                self.winner = stone
+                self.win_length = len(self.history)
+
+    def make(self, cell):
+        """
+        Plays the player to move on an empty cell.
+        The cell is not validated: callers take cells from actions().
+        """
+        self.place(cell, X if len(self.history) % 2 == 0 else O)
+
+    def unmake(self):
+        """
+        Takes back the last move made.
+        """
+        cell = self.history.pop()
+        if (self.win_length is not None and len(self.history) < self.win_length):
+            self.winner = None
+            self.win_length = None
+        stone = self.cells[cell]
+        self.hash ^= self.game.zobrist[stone][cell]
+        if (self.hashes is not None):
+            self.hashes = [position_hash ^ key for position_hash, key
+                           in zip(self.hashes, self.game.symmetric_zobrist[stone][cell])]
+        counts = self.counts[stone]
+        for line in self.game.cell_lines[cell]:
+            counts[line] -= 1
+        self.cells[cell] = EMPTY
+
+    def track_symmetries(self):
+        """
+        Starts keeping the hash of the position under every symmetry of the board, for canonical_key().
+        """
+        if (self.hashes is None):
+            hashes = [0] * len(self.game.symmetries)
+            for cell, stone in enumerate(self.cells):
+                if (stone != EMPTY):
+                    hashes = [position_hash ^ key
+                              for position_hash, key in zip(hashes, self.game.symmetric_zobrist[stone][cell])]
+            self.hashes = hashes
+
+    def canonical_key(self):
+        """
+        Returns (key, symmetry): the smallest hash of the position under any symmetry, the same for every position
+        in its symmetry class, and the symmetry that gives it. Needs track_symmetries().
+        """
+        hashes = self.hashes
+        key = min(hashes)
+        return key, hashes.index(key)
+
+    def to_board(self):
+        """
+        Returns the list-of-lists board of the position.
+        """
+        cols = self.game.cols
+        return [self.cells[row_index * cols:(row_index + 1) * cols] for row_index in range(self.game.rows)]
@@ -0,0 +1,153 @@
+"""
+Parallel root split search over m,n,k game states
+
+The first root move is searched in the calling process to establish a bound (young brothers wait), then the remaining
+root moves are searched in a pool of worker processes. Workers share the best score found so far through shared
+memory: each reads it before searching its move, to narrow its window, and raises it when it finds a better move.
+
+A move whose search fails against a shared bound only proves its score is no better than that bound, so after the
+pool finishes, moves that could still tie the best score are searched again with a full window. The move returned is
+therefore the first best move in the order of state.actions(), exactly as the serial search would return.
+
+Run this module for a speed-up versus worker count report:
+    python parallel.py [m n k max_depth max_workers]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import mnk
+import search
+from bitboard import X, O, MIN_SCORE, MAX_SCORE
+
+# best root score found so far, shared with the worker processes
+_shared_bound = None
+
+# games built in this process, keyed by (m, n, k)
+_games = {}
+
+
+def _init_worker(shared_bound):
+    global _shared_bound
+    _shared_bound = shared_bound
+
+
+def _game(m, n, k):
+    game = _games.get((m, n, k))
+    if (game is None):
+        game = mnk.Game(m, n, k)
+        _games[(m, n, k)] = game
+    return game
+
+
+def _state(dimensions, cells):
+    state = _game(*dimensions).new_state()
+    for cell, stone in enumerate(cells):
+        if (stone is not None):
+            state.place(cell, stone)
+    return state
+
+
+def search_move(state, cell, depth, bound, evaluate=search.evaluate):
+    """
+    Returns (score, nodes) of the root move cell searched depth - 1 moves further, with the root player's best score
+    so far as bound. A score no better than bound is only an upper (X) or lower (O) bound on the move's true score.
+    """
+    move_count = len(state.history)
+    searcher = search.Search(state, evaluate)
+    if (move_count % 2 == 0):
+        state.place(cell, X)
+        score = searcher.min_value(move_count + 1, depth - 1, bound, MAX_SCORE)
+    else:
+        state.place(cell, O)
+        score = searcher.max_value(move_count + 1, depth - 1, MIN_SCORE, bound)
+    state.unmake()
+    return score, searcher.nodes
+
+
+def _search_move(dimensions, cells, cell, depth, evaluate):
+    """
+    Worker task: searches one root move against the shared bound, and raises the bound if the move beats it.
+    Returns (cell, score, bound used, nodes).
+    """
+    state = _state(dimensions, cells)
+    maximising = len(state.history) % 2 == 0
+    bound = _shared_bound.value
+    score, nodes = search_move(state, cell, depth, bound, evaluate)
+    with _shared_bound.get_lock():
+        if ((maximising and score > _shared_bound.value) or (not maximising and score < _shared_bound.value)):
+            _shared_bound.value = score
+    return cell, score, bound, nodes
+
+
+def parallel_minimax(state, workers=None, max_depth=None, evaluate=search.evaluate):
+    """
+    Returns the same cell as search.minimax(state, max_depth, evaluate), searching the root moves in workers processes.
+    The evaluation must be a module level function so the workers can import it.
+    """
+    if (state.terminal()):
+        return None
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    actions = state.actions()
+    if (workers < 2 or len(actions) < 2):
+        return search.minimax(state, max_depth, evaluate)
+
+    game = state.game
+    remaining = game.size - len(state.history)
+    depth = remaining if max_depth is None else min(max_depth, remaining)
+    maximising = len(state.history) % 2 == 0
+    full_window = MIN_SCORE if maximising else MAX_SCORE
+
+    # young brothers wait: the first move is searched alone to give the others a bound
+    first_score, _ = search_move(state, actions[0], depth, full_window, evaluate)
+    shared_bound = multiprocessing.Value("d", first_score)
+    results = [(actions[0], first_score, full_window, 0)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared_bound,)) as executor:
+        results.extend(executor.map(_search_move, repeat((game.rows, game.cols, game.k)), repeat(list(state.cells)),
+                                    actions[1:], repeat(depth), repeat(evaluate)))
+
+    def exact(score, bound):
+        return score > bound if maximising else score < bound
+
+    exact_scores = [score for _, score, bound, _ in results if exact(score, bound)]
+    best_score = max(exact_scores) if maximising else min(exact_scores)
+    for cell, score, bound, _ in results:
+        if (score != best_score):
+            continue
+        if (not exact(score, bound)):
+            # failed against a bound equal to the best score: it may tie, so find its true score
+            score, _ = search_move(state, cell, depth, full_window, evaluate)
+            if (score != best_score):
+                continue
+        return cell
+
+
+def speedup_report(game, max_depth, max_workers, board=None):
+    """
+    Prints the time taken to search board (or the empty board) with 1 to max_workers workers,
+    and the speed-up over one worker.
+    """
+    state = game.new_state(board)
+    print(f"{game!r} depth {max_depth} on {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'cell':>5} {'seconds':>9} {'speed-up':>9}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        cell = parallel_minimax(state, workers, max_depth)
+        elapsed = time.perf_counter() - start
+        if (baseline is None):
+            baseline = elapsed
+        print(f"{workers:>7} {cell:>5} {elapsed:>9.3f} {baseline / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) == 6):
+        m, n, k, max_depth, max_workers = (int(argument) for argument in sys.argv[1:])
+    else:
+        m, n, k, max_depth, max_workers = 4, 4, 4, 6, os.cpu_count() or 1
+    speedup_report(mnk.Game(m, n, k), max_depth, max_workers)
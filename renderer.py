@@ -0,0 +1,143 @@
+"""
+Tic Tac Toe window renderer
+
+Text and button surfaces are rendered once and cached, the tile geometry is built once, and each frame only the
+regions whose content changed since the last frame are redrawn and pushed to the display.
+"""
+
+import pygame
+
+import tictactoe as ttt
+
+# Colors
+black = (0, 0, 0)
+white = (255, 255, 255)
+
+TILE_SIZE = 80
+
+
+class Renderer:
+
+    def __init__(self, screen, mediumFont, largeFont, moveFont):
+        self.screen = screen
+        self.width, self.height = screen.get_size()
+        self.mediumFont = mediumFont
+        self.largeFont = largeFont
+        self.titles = {}
+
+        # Glyphs for the moves, rendered once
+        self.glyphs = {
+            ttt.X: moveFont.render(ttt.X, True, white),
+            ttt.O: moveFont.render(ttt.O, True, white),
+        }
+
+        # Tile geometry, built once
+        tile_origin = (self.width / 2 - (1.5 * TILE_SIZE),
+                       self.height / 2 - (1.5 * TILE_SIZE))
+        self.tiles = []
+        for i in range(3):
+            row = []
+            for j in range(3):
+                row.append(pygame.Rect(
+                    tile_origin[0] + j * TILE_SIZE,
+                    tile_origin[1] + i * TILE_SIZE,
+                    TILE_SIZE, TILE_SIZE
+                ))
+            self.tiles.append(row)
+
+        # Buttons, rendered once
+        self.playXButton = pygame.Rect((self.width / 8), (self.height / 2), self.width / 4, 50)
+        self.playOButton = pygame.Rect(5 * (self.width / 8), (self.height / 2), self.width / 4, 50)
+        self.againButton = pygame.Rect(self.width / 3, self.height - 65, self.width / 3, 50)
+        self.playX = self.render_button(self.playXButton, "Play as X")
+        self.playO = self.render_button(self.playOButton, "Play as O")
+        self.again = self.render_button(self.againButton, "Play Again")
+
+        # What is currently on the display
+        self.scene = None
+        self.shownTitle = None
+        self.shownCells = None
+        self.shownAgain = False
+
+    def render_button(self, button, text):
+        surface = pygame.Surface(button.size)
+        surface.fill(white)
+        label = self.mediumFont.render(text, True, black)
+        labelRect = label.get_rect()
+        labelRect.center = surface.get_rect().center
+        surface.blit(label, labelRect)
+        return surface
+
+    def title_surface(self, text):
+        surface = self.titles.get(text)
+        if surface is None:
+            surface = self.largeFont.render(text, True, white)
+            self.titles[text] = surface
+        return surface
+
+    def draw_title(self, text, center_y):
+        """
+        Draws text centred at center_y over the previous title, and returns the dirty region.
+        """
+        area = pygame.Rect(0, center_y - 30, self.width, 60)
+        self.screen.fill(black, area)
+        title = self.title_surface(text)
+        titleRect = title.get_rect()
+        titleRect.center = ((self.width / 2), center_y)
+        self.screen.blit(title, titleRect)
+        self.shownTitle = text
+        return area
+
+    def draw_menu(self):
+        """
+        Draws the player selection screen, if it is not already shown.
+        """
+        if self.scene == "menu":
+            return
+        self.screen.fill(black)
+        self.draw_title("Play Tic-Tac-Toe", 50)
+        self.screen.blit(self.playX, self.playXButton)
+        self.screen.blit(self.playO, self.playOButton)
+        self.scene = "menu"
+        pygame.display.flip()
+
+    def draw_game(self, board, title, show_again):
+        """
+        Redraws the parts of the game screen that differ from what is shown.
+        """
+        dirty = []
+        if self.scene != "game":
+            self.screen.fill(black)
+            self.scene = "game"
+            self.shownTitle = None
+            self.shownCells = None
+            self.shownAgain = False
+            dirty.append(self.screen.get_rect())
+
+        if title != self.shownTitle:
+            dirty.append(self.draw_title(title, 30))
+
+        for i in range(3):
+            for j in range(3):
+                if self.shownCells is None or self.shownCells[i][j] != board[i][j]:
+                    rect = self.tiles[i][j]
+                    self.screen.fill(black, rect)
+                    pygame.draw.rect(self.screen, white, rect, 3)
+                    if board[i][j] != ttt.EMPTY:
+                        move = self.glyphs[board[i][j]]
+                        moveRect = move.get_rect()
+                        moveRect.center = rect.center
+                        self.screen.blit(move, moveRect)
+                    dirty.append(rect)
+        self.shownCells = [list(row) for row in board]
+
+        if show_again != self.shownAgain:
+            if show_again:
+                self.screen.blit(self.again, self.againButton)
+            else:
+                self.screen.fill(black, self.againButton)
+            self.shownAgain = show_again
+            dirty.append(self.againButton)
+
+        if dirty:
+            pygame.display.update(dirty)
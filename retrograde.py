@@ -0,0 +1,137 @@
+"""
+Retrograde analysis of m,n,k games with NumPy
+
+Instead of searching down from one position, every board is solved at once. A board is an index in base 3, with cell
+c as digit c (0 empty, 1 X, 2 O), so the whole game is a handful of arrays of 3 ** (m * n) entries.
+Stone counts and finished lines are computed for every board with broadcast array operations, one cell or one line at
+a time. Scores are then propagated backwards one ply at a time, from the full boards to the empty board: every board
+with p stones takes the best score of its children, which all have p + 1 stones and are already solved.
+
+Scores follow the bitboard engine: a finished game scores its utility times (1 + the number of empty cells), so the
+sign of a score is the game theoretic value. Boards that cannot occur in a game score INVALID.
+
+3x3 solves in milliseconds; 4x4 (43 million boards) in seconds, using about 300 megabytes.
+"""
+
+import numpy as np
+
+from bitboard import X, O, EMPTY
+
+INVALID = -128
+
+# beyond 16 cells the arrays no longer fit in memory
+MAX_CELLS = 16
+
+DIGITS = {EMPTY: 0, X: 1, O: 2}
+
+
+def position_index(game, board):
+    """
+    Returns the base 3 index of a list-of-lists board.
+    """
+    index = 0
+    for row_index in range(game.rows - 1, -1, -1):
+        for col_index in range(game.cols - 1, -1, -1):
+            index = index * 3 + DIGITS[board[row_index][col_index]]
+    return index
+
+
+def _digit_view(size, cell, digit):
+    """
+    Returns a boolean array, broadcastable over all boards, that is True where cell holds digit.
+    The board array has one axis per cell, with cell 0 as the last (least significant) axis.
+    """
+    shape = [1] * size
+    shape[size - 1 - cell] = 3
+    return (np.arange(3) == digit).reshape(shape)
+
+
+def solve(game):
+    """
+    Returns a flat int8 array with the score of every board of game, indexed by position_index().
+    """
+    size = game.size
+    if (size > MAX_CELLS):
+        raise ValueError(f"Too many cells to solve by retrograde analysis: {game!r}")
+    shape = (3,) * size
+
+    # stones of each player on every board
+    x_count = np.zeros(shape, dtype=np.int8)
+    o_count = np.zeros(shape, dtype=np.int8)
+    for cell in range(size):
+        x_count += _digit_view(size, cell, 1)
+        o_count += _digit_view(size, cell, 2)
+
+    # boards where each player has a complete line
+    x_win = np.zeros(shape, dtype=bool)
+    o_win = np.zeros(shape, dtype=bool)
+    for line in game.lines:
+        x_line = _digit_view(size, line[0], 1)
+        o_line = _digit_view(size, line[0], 2)
+        for cell in line[1:]:
+            x_line = x_line & _digit_view(size, cell, 1)
+            o_line = o_line & _digit_view(size, cell, 2)
+        np.logical_or(x_win, x_line, out=x_win)
+        np.logical_or(o_win, o_line, out=o_win)
+
+    x_count = x_count.ravel()
+    o_count = o_count.ravel()
+    x_win = x_win.ravel()
+    o_win = o_win.ravel()
+    stones = x_count + o_count
+    difference = x_count - o_count
+    del x_count, o_count
+
+    # a board is valid if the players alternated and at most one of them has won, on their own move
+    valid = (difference == 0) | (difference == 1)
+    valid &= ~(x_win & o_win)
+    valid &= ~(x_win & (difference == 0))
+    valid &= ~(o_win & (difference == 1))
+    del difference
+
+    terminal = x_win | o_win | (stones == size)
+    empty_plus_one = (size + 1 - stones).astype(np.int8)
+    scores = np.zeros(3 ** size, dtype=np.int8)
+    scores[x_win] = empty_plus_one[x_win]
+    scores[o_win] = -empty_plus_one[o_win]
+    del x_win, o_win, empty_plus_one
+
+    open_boards = valid & ~terminal
+    scores[~valid] = INVALID
+    del valid, terminal
+
+    powers = [3 ** cell for cell in range(size)]
+    for ply in range(size - 1, -1, -1):
+        indexes = np.flatnonzero(open_boards & (stones == ply))
+        if (not len(indexes)):
+            continue
+        x_to_move = ply % 2 == 0
+        digit = 1 if x_to_move else 2
+        best = np.full(len(indexes), -127 if x_to_move else 127, dtype=np.int8)
+        for cell in range(size):
+            empty = (indexes // powers[cell]) % 3 == 0
+            child_scores = scores[indexes[empty] + digit * powers[cell]]
+            if (x_to_move):
+                best[empty] = np.maximum(best[empty], child_scores)
+            else:
+                best[empty] = np.minimum(best[empty], child_scores)
+        scores[indexes] = best
+
+    return scores
+
+
+def score(scores, game, board):
+    """
+    Returns the score of a list-of-lists board from a solved scores array.
+    """
+    return int(scores[position_index(game, board)])
+
+
+def value(scores, game, board):
+    """
+    Returns the game theoretic value of a board: 1 if X wins, -1 if O wins, 0 for a tie, None if the board is invalid.
+    """
+    board_score = score(scores, game, board)
+    if (board_score == INVALID):
+        return None
+    return (board_score > 0) - (board_score < 0)
@@ -1,94 +1,87 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import cache
 import tictactoe as ttt
+from renderer import Renderer
 
 pygame.init()
 size = width, height = 600, 400
 
-# Colors
-black = (0, 0, 0)
-white = (255, 255, 255)
+# Frames per second; the loop sleeps for the rest of each frame
+fps = 30
 
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+renderer = Renderer(screen, mediumFont, largeFont, moveFont)
+
+# Start with the search results saved by earlier runs
+cache.warm()
+
+# Minimum time the computer appears to think before its move is shown
+ai_delay = 0.5
+
+# The AI move is computed on a worker thread so the window keeps responding
+executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_cancel = None
+ai_started = None
+
+
+def start_ai_move(board):
+    global ai_future, ai_cancel, ai_started
+    ai_cancel = threading.Event()
+    ai_future = executor.submit(ttt.minimax, board, cancel=ai_cancel)
+    ai_started = time.time()
+
+
+def cancel_ai_move():
+    global ai_future, ai_cancel
+    if ai_future is not None:
+        ai_cancel.set()
+        ai_future.cancel()
+    ai_future = None
+    ai_cancel = None
+
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai_move()
+            executor.shutdown(wait=False)
+            cache.save()
             sys.exit()
 
-    screen.fill(black)
-
     # Let user choose a player.
     if user is None:
 
-        # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Draw buttons
-        playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
-        playX = mediumFont.render("Play as X", True, black)
-        playXRect = playX.get_rect()
-        playXRect.center = playXButton.center
-        pygame.draw.rect(screen, white, playXButton)
-        screen.blit(playX, playXRect)
-
-        playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
-        playO = mediumFont.render("Play as O", True, black)
-        playORect = playO.get_rect()
-        playORect.center = playOButton.center
-        pygame.draw.rect(screen, white, playOButton)
-        screen.blit(playO, playORect)
+        renderer.draw_menu()
 
         # Check if button is clicked
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1:
             mouse = pygame.mouse.get_pos()
-            if playXButton.collidepoint(mouse):
+            if renderer.playXButton.collidepoint(mouse):
                 time.sleep(0.2)
                 user = ttt.X
-            elif playOButton.collidepoint(mouse):
+            elif renderer.playOButton.collidepoint(mouse):
                 time.sleep(0.2)
                 user = ttt.O
 
     else:
 
-        # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
-        tiles = []
-        for i in range(3):
-            row = []
-            for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                pygame.draw.rect(screen, white, rect, 3)
-
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
-                    moveRect = move.get_rect()
-                    moveRect.center = rect.center
-                    screen.blit(move, moveRect)
-                row.append(rect)
-            tiles.append(row)
-
         game_over = ttt.terminal(board)
         player = ttt.player(board)
 
@@ -102,21 +95,21 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
-        title = largeFont.render(title, True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 30)
-        screen.blit(title, titleRect)
+            dots = int((time.time() - ai_started) * 3) % 4 if ai_started is not None else 0
+            title = f"Computer thinking" + "." * dots + " " * (3 - dots)
+
+        # Draw game board
+        renderer.draw_game(board, title, game_over)
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                start_ai_move(board)
+            elif ai_future.done() and time.time() - ai_started >= ai_delay:
+                move = ai_future.result()
+                ai_future = None
+                ai_cancel = None
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -124,23 +117,17 @@ while True:
             mouse = pygame.mouse.get_pos()
             for i in range(3):
                 for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
+                    if (board[i][j] == ttt.EMPTY and renderer.tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
         if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
             click, _, _ = pygame.mouse.get_pressed()
             if click == 1:
                 mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
+                if renderer.againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    cancel_ai_move()
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
-    pygame.display.flip()
+    clock.tick(fps)
@@ -0,0 +1,327 @@
+"""
+Alpha / beta search over m,n,k game states
+
+The search makes and unmakes moves on a single mutable State instead of building a new board for every node,
+and passes the number of stones on the board down the tree so no node has to count them.
+Scores follow the bitboard engine: a finished game scores its utility times (1 + the number of empty cells).
+
+Searches can be limited in depth, scoring unfinished positions at the depth limit with a heuristic evaluation,
+and in time: iterative_deepening() searches one ply deeper at a time, trying the principal variation of the previous
+iteration first, and returns the best move of the last completed iteration when the time runs out or the search is
+cancelled.
+
+Given a TranspositionTable, a search stores the score of every node it searches to the end of the game under the
+canonical Zobrist key of its State, so symmetric and transposed positions are searched once. Nodes whose search is cut
+off by the depth limit are not stored: their scores depend on the depth left.
+
+Every search fills in a SearchStats. A per node hook, on_node, is only installed when one is given, so a search
+without it runs the plain methods; iterative_deepening() also takes on_depth, called after each completed iteration.
+"""
+
+import time
+
+from bitboard import X, O, MIN_SCORE, MAX_SCORE, bound_flag
+from stats import SearchStats
+from transposition import EXACT, LOWER
+
+# number of nodes searched between checks of the clock
+CLOCK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline has passed or it has been cancelled.
+    """
+
+
+def evaluate(state):
+    """
+    Returns a heuristic score for an unfinished state, strictly between -1 and 1 so that it never outweighs a
+    finished game. Each line still open to only one player scores the square of that player's stones in it.
+    """
+    x_counts = state.counts[X]
+    o_counts = state.counts[O]
+    score = 0
+    for line in range(len(x_counts)):
+        if (not o_counts[line]):
+            score += x_counts[line] * x_counts[line]
+        elif (not x_counts[line]):
+            score -= o_counts[line] * o_counts[line]
+    return score / (1 + abs(score))
+
+
+class Search:
+    """
+    Searches one State in place. The state is left as it was found when a search returns.
+    With on_node, on_node(ply, depth, alpha, beta, search) is called on entering every node, where ply is the number
+    of stones on the board and depth the number of moves left to search, as in the bitboard search.
+    """
+
+    def __init__(self, state, evaluate=evaluate, deadline=None, cancel=None, stats=None, on_node=None, table=None):
+        self.state = state
+        self.table = table
+        if (table is not None):
+            state.track_symmetries()
+        self.evaluate = evaluate
+        self.deadline = deadline
+        self.cancel = cancel
+        self.nodes = 0
+        self.stats = SearchStats(state.game.size) if stats is None else stats
+        if (on_node is not None):
+            # instance attributes shadow the methods, so the recursion goes through the hook
+            self.max_value = self._hooked(self.max_value, on_node)
+            self.min_value = self._hooked(self.min_value, on_node)
+        # principal variation of the previous iteration, tried first by the next one
+        self.previous_pv = []
+        self.follow_pv = False
+        # pv[ply] is the best line found from the node at ply of the current search
+        self.pv = [[] for _ in range(state.game.size + 1)]
+        self.root_count = len(state.history)
+
+    def _hooked(self, method, on_node):
+        """
+        Returns method wrapped to call on_node first.
+        """
+        def value(move_count, depth, alpha, beta):
+            on_node(move_count, depth, alpha, beta, self)
+            return method(move_count, depth, alpha, beta)
+        return value
+
+    def minimax(self, depth=None):
+        """
+        Returns the optimal cell for the player to move, or None if the game is over.
+        If depth is given, positions depth moves ahead are scored with the heuristic evaluation.
+        """
+        return self.root(depth)[0]
+
+    def root(self, depth=None):
+        """
+        Returns (cell, score) for the best move searched to depth, or (None, score) if the game is over.
+        """
+        state = self.state
+        move_count = len(state.history)
+        self.root_count = move_count
+        if (depth is None):
+            depth = state.game.size - move_count
+        self.follow_pv = bool(self.previous_pv)
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            if (move_count % 2 == 0):
+                score = self.max_value(move_count, depth, MIN_SCORE, MAX_SCORE)
+            else:
+                score = self.min_value(move_count, depth, MIN_SCORE, MAX_SCORE)
+        finally:
+            stats.elapsed += time.perf_counter() - start
+        pv = self.pv[0]
+        stats.depth = depth
+        stats.pv = list(pv)
+        return (pv[0] if pv else None), score
+
+    def stopped(self):
+        """
+        Returns True if the deadline has passed or the search has been cancelled.
+        """
+        if (self.deadline is not None and time.perf_counter() > self.deadline):
+            return True
+        return self.cancel is not None and self.cancel.is_set()
+
+    def ordered_actions(self, ply, hash_cell=None):
+        """
+        Returns the empty cells, with the principal variation move first while still following it,
+        and otherwise the best cell stored in the transposition table first.
+        """
+        actions = self.state.actions()
+        if (self.follow_pv):
+            self.follow_pv = False
+            if (ply < len(self.previous_pv)):
+                cell = self.previous_pv[ply]
+                if (cell in actions):
+                    actions.remove(cell)
+                    actions.insert(0, cell)
+                    self.follow_pv = True
+                    return actions
+        if (hash_cell is not None and hash_cell in actions):
+            actions.remove(hash_cell)
+            actions.insert(0, hash_cell)
+        return actions
+
+    def probe(self, ply, alpha, beta):
+        """
+        Returns (key, symmetry, score, alpha, beta, hash_cell) for a node searched to the end of the game: the
+        canonical key of the state and its symmetry, the stored score if it decides the node (else None), the window
+        narrowed by a stored bound, and the stored best cell mapped back to the state's orientation.
+        The root (ply 0) is never answered from the table, so that its best line is always searched.
+        """
+        key, symmetry = self.state.canonical_key()
+        if (not ply):
+            return key, symmetry, None, alpha, beta, None
+        self.stats.probes += 1
+        entry = self.table.probe(key)
+        if (entry is None):
+            return key, symmetry, None, alpha, beta, None
+        self.stats.hits += 1
+        value, flag, stored_cell = entry
+        if (flag == EXACT):
+            return key, symmetry, value, alpha, beta, None
+        if (flag == LOWER):
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if (beta <= alpha):
+            return key, symmetry, value, alpha, beta, None
+        hash_cell = None
+        if (stored_cell is not None):
+            hash_cell = self.state.game.inverse_symmetries[symmetry][stored_cell]
+        return key, symmetry, None, alpha, beta, hash_cell
+
+    def store(self, key, symmetry, score, alpha, beta, best_cell):
+        """
+        Stores the score of a node searched to the end of the game with window (alpha, beta).
+        """
+        if (best_cell is not None):
+            best_cell = self.state.game.symmetries[symmetry][best_cell]
+        self.table.store(key, score, bound_flag(score, alpha, beta), best_cell)
+
+    def max_value(self, move_count, depth, alpha, beta):
+        """
+        Returns the score of the state with X to move and move_count stones on the board, searched depth moves ahead.
+        """
+        self.nodes += 1
+        if (self.nodes % CLOCK_INTERVAL == 0 and self.stopped()):
+            raise SearchTimeout()
+        self.stats.nodes[move_count] += 1
+        state = self.state
+        ply = move_count - self.root_count
+        pv = self.pv
+        pv[ply] = []
+        empty = state.game.size - move_count
+        if (state.winner is not None):
+            return state.utility() * (1 + empty)
+        if (not empty):
+            return 0
+        if (depth == 0):
+            return self.evaluate(state)
+        # a node searched to the end of the game has a score independent of the depth, and can be stored
+        solved = self.table is not None and depth >= empty
+        hash_cell = None
+        if (solved):
+            key, symmetry, value, alpha, beta, hash_cell = self.probe(ply, alpha, beta)
+            if (value is not None):
+                return value
+            window_alpha = alpha
+            window_beta = beta
+        self.stats.expanded[move_count] += 1
+        score = MIN_SCORE
+        best_cell = None
+        for cell in self.ordered_actions(ply, hash_cell):
+            state.place(cell, X)
+            value = self.min_value(move_count + 1, depth - 1, alpha, beta)
+            state.unmake()
+            if (value > score):
+                score = value
+                best_cell = cell
+                pv[ply] = [cell] + pv[ply + 1]
+            alpha = max(alpha, score)
+            if beta <= alpha:
+                # alpha / beta pruning
+                self.stats.beta_cutoffs += 1
+                break
+        if (solved):
+            self.store(key, symmetry, score, window_alpha, window_beta, best_cell)
+        return score
+
+    def min_value(self, move_count, depth, alpha, beta):
+        """
+        Returns the score of the state with O to move and move_count stones on the board, searched depth moves ahead.
+        """
+        self.nodes += 1
+        if (self.nodes % CLOCK_INTERVAL == 0 and self.stopped()):
+            raise SearchTimeout()
+        self.stats.nodes[move_count] += 1
+        state = self.state
+        ply = move_count - self.root_count
+        pv = self.pv
+        pv[ply] = []
+        empty = state.game.size - move_count
+        if (state.winner is not None):
+            return state.utility() * (1 + empty)
+        if (not empty):
+            return 0
+        if (depth == 0):
+            return self.evaluate(state)
+        # a node searched to the end of the game has a score independent of the depth, and can be stored
+        solved = self.table is not None and depth >= empty
+        hash_cell = None
+        if (solved):
+            key, symmetry, value, alpha, beta, hash_cell = self.probe(ply, alpha, beta)
+            if (value is not None):
+                return value
+            window_alpha = alpha
+            window_beta = beta
+        self.stats.expanded[move_count] += 1
+        score = MAX_SCORE
+        best_cell = None
+        for cell in self.ordered_actions(ply, hash_cell):
+            state.place(cell, O)
+            value = self.max_value(move_count + 1, depth - 1, alpha, beta)
+            state.unmake()
+            if (value < score):
+                score = value
+                best_cell = cell
+                pv[ply] = [cell] + pv[ply + 1]
+            beta = min(beta, score)
+            if beta <= alpha:
+                # alpha / beta pruning
+                self.stats.alpha_cutoffs += 1
+                break
+        if (solved):
+            self.store(key, symmetry, score, window_alpha, window_beta, best_cell)
+        return score
+
+
+def minimax(state, max_depth=None, evaluate=evaluate, table=None):
+    """
+    Returns the optimal cell for the player to move in state, or None if the game is over.
+    If max_depth is given, positions max_depth moves ahead are scored with the heuristic evaluation.
+    """
+    return Search(state, evaluate, table=table).minimax(max_depth)
+
+
+def iterative_deepening(state, time_limit=None, max_depth=None, evaluate=evaluate, cancel=None, stats=None,
+                        on_depth=None, on_node=None, table=None):
+    """
+    Returns the best cell for the player to move in state, or None if the game is over.
+    Searches to depth 1, 2, ... up to max_depth, or until the game tree is exhausted or a win or loss is proven.
+    If time_limit seconds pass first, the search stops and the best cell of the deepest completed iteration is
+    returned; if not even depth 1 completes, the first empty cell is.
+    Setting the threading.Event cancel from another thread stops the search the same way.
+    Pass a SearchStats to read the search statistics afterwards. With on_depth, on_depth(depth, cell, score, stats)
+    is called after each completed iteration. With a TranspositionTable, nodes searched to the end of the game in
+    one iteration are looked up by the next.
+    """
+    if (state.terminal()):
+        return None
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    searcher = Search(state, evaluate, deadline, cancel, stats, on_node, table)
+    root_length = len(state.history)
+    remaining = state.game.size - root_length
+    if (max_depth is None or max_depth > remaining):
+        max_depth = remaining
+
+    best_cell = state.actions()[0]
+    for depth in range(1, max_depth + 1):
+        try:
+            cell, score = searcher.root(depth)
+        except SearchTimeout:
+            while len(state.history) > root_length:
+                state.unmake()
+            break
+        best_cell = cell
+        searcher.previous_pv = list(searcher.pv[0])
+        if (on_depth is not None):
+            on_depth(depth, cell, score, searcher.stats)
+        if (abs(score) >= 1):
+            # a win or loss is proven, deeper searches cannot change the outcome
+            break
+    return best_cell
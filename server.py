@@ -0,0 +1,261 @@
+"""
+Tic Tac Toe engine server
+
+An asyncio server that reads newline delimited JSON requests over TCP or a Unix socket and answers each with one line
+of JSON. Searches run in an executor, so the event loop keeps serving other connections while they run, and requests
+for the same position (up to symmetry) while its search is pending share that one search.
+
+Requests carry an "op", an optional "id" echoed in the response and an optional "session" name; without one, each
+connection has its own session. Named sessions last until ended, idle for longer than the session TTL, or dropped as
+the least recently used when there are more than the maximum number of sessions. Boards are lists of rows of "X",
+"O" or null.
+    {"op": "new"}                              start the session's game from the empty board
+    {"op": "move", "action": [i, j]}           play a move for the player to move in the session's game
+    {"op": "best"}                             the best action in the session's game
+    {"op": "play"}                             play the best action in the session's game
+    {"op": "end"}                              end the session
+    {"op": "solve", "board": [[...], ...]}     the best action on a board, without a session
+    {"op": "stats"}                            the server's request, search, coalescing and session counters
+Every response has "ok", the session's "board" where there is one, "action" for best, play and solve, "error" if the
+request failed, and "latency", the seconds the server spent on the request.
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--workers N] [--max-sessions N]
+                     [--session-ttl SECONDS]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bitboard
+import symmetry
+import tictactoe as ttt
+from bitboard import X, O, EMPTY
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# most sessions kept, and seconds a session is kept without requests
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SESSION_TTL = 3600
+
+
+def parse_board(board):
+    """
+    Returns a board read from JSON, raising ValueError if it is not a reachable Tic Tac Toe board.
+    """
+    if (not isinstance(board, list) or len(board) != 3
+            or any(not isinstance(row, list) or len(row) != 3 for row in board)):
+        raise ValueError("Board must be 3 rows of 3 cells")
+    if (any(cell not in (X, O, EMPTY) for row in board for cell in row)):
+        raise ValueError('Cells must be "X", "O" or null')
+    board = [list(row) for row in board]
+    x, o = bitboard.from_board(board)
+    if (bitboard.POPCOUNT[x] - bitboard.POPCOUNT[o] not in (0, 1)):
+        raise ValueError("Board is not reachable")
+    return board
+
+
+def parse_action(action):
+    """
+    Returns an action read from JSON, raising ValueError if it is not a pair of cell coordinates.
+    """
+    if (not isinstance(action, list) or len(action) != 2
+            or any(not isinstance(index, int) or not 0 <= index < 3 for index in action)):
+        raise ValueError("Action must be [row, column]")
+    return tuple(action)
+
+
+def solve_cell(x, o):
+    """
+    Returns the best cell of a position, or None if the game is over. Runs in the executor.
+    """
+    action = ttt.minimax(bitboard.to_board(x, o))
+    return None if action is None else bitboard.cell_index(action)
+
+
+class Server:
+    """
+    Serves the engine to connections, keeping the sessions and the searches in progress.
+    """
+
+    def __init__(self, executor=None, max_sessions=DEFAULT_MAX_SESSIONS, session_ttl=DEFAULT_SESSION_TTL):
+        self.executor = executor
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        # session -> (board, time of its last request), least recently used first
+        self.sessions = OrderedDict()
+        self.expired = 0
+        # canonical position key -> future of the search of the canonical position
+        self.pending = {}
+        self.requests = 0
+        self.searches = 0
+        self.coalesced = 0
+
+    async def best_action(self, board):
+        """
+        Returns the best action on board, sharing the search of any pending request for the same position.
+        """
+        x, o, transform = symmetry.canonical(*bitboard.from_board(board))
+        key = bitboard.position_key(x, o)
+        future = self.pending.get(key)
+        if (future is None):
+            future = asyncio.get_running_loop().run_in_executor(self.executor, solve_cell, x, o)
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+            self.searches += 1
+        else:
+            self.coalesced += 1
+        # a client disconnecting must not cancel a search other requests are waiting for
+        cell = await asyncio.shield(future)
+        if (cell is None):
+            return None
+        return bitboard.cell_action(symmetry.transform_cell(cell, symmetry.INVERSE[transform]))
+
+    def expire_sessions(self, now=None):
+        """
+        Drops the sessions idle for longer than the session TTL, then the least recently used sessions beyond the
+        maximum number.
+        """
+        now = time.monotonic() if now is None else now
+        while self.sessions:
+            session, (_, used) = next(iter(self.sessions.items()))
+            if (len(self.sessions) <= self.max_sessions and now - used <= self.session_ttl):
+                break
+            del self.sessions[session]
+            self.expired += 1
+
+    def set_session(self, session, board):
+        """
+        Stores the board of a session and marks the session as just used.
+        """
+        self.sessions[session] = (board, time.monotonic())
+        self.sessions.move_to_end(session)
+        self.expire_sessions()
+
+    def get_session(self, session):
+        """
+        Returns the board of a session and marks the session as just used, raising ValueError if it has no game.
+        """
+        self.expire_sessions()
+        if (session not in self.sessions):
+            raise ValueError(f"No game in session: {session}")
+        board = self.sessions[session][0]
+        self.set_session(session, board)
+        return board
+
+    async def respond(self, request, connection_session):
+        """
+        Returns the response to one decoded request.
+        """
+        if (not isinstance(request, dict)):
+            raise ValueError("Request must be a JSON object")
+        op = request.get("op")
+        if (op == "solve"):
+            action = await self.best_action(parse_board(request.get("board")))
+            return {"action": action}
+        if (op == "stats"):
+            return {"requests": self.requests, "searches": self.searches, "coalesced": self.coalesced,
+                    "pending": len(self.pending), "sessions": len(self.sessions), "expired": self.expired}
+
+        session = request.get("session", connection_session)
+        if (op == "new"):
+            board = ttt.initial_state()
+            self.set_session(session, board)
+            return {"board": board}
+        board = self.get_session(session)
+        if (op == "end"):
+            del self.sessions[session]
+            return {"board": board}
+        if (op == "move"):
+            action = parse_action(request.get("action"))
+            if (ttt.terminal(board) or board[action[0]][action[1]] != EMPTY):
+                raise ValueError(f"Illegal move: {list(action)}")
+            board = ttt.result(board, action)
+            self.set_session(session, board)
+            return {"board": board}
+        if (op in ("best", "play")):
+            action = await self.best_action(board)
+            if (op == "play" and action is not None):
+                if (self.sessions.get(session, (None,))[0] is not board):
+                    raise ValueError(f"Session changed during the search: {session}")
+                board = ttt.result(board, action)
+                self.set_session(session, board)
+            return {"action": action, "board": board}
+        raise ValueError(f"Unknown op: {op}")
+
+    async def handle(self, reader, writer):
+        """
+        Answers the requests of one connection in order until it closes.
+        """
+        connection_session = object()
+        try:
+            while True:
+                line = await reader.readline()
+                if (not line):
+                    break
+                start = time.perf_counter()
+                self.requests += 1
+                request = None
+                try:
+                    request = json.loads(line)
+                    response = await self.respond(request, connection_session)
+                    response["ok"] = True
+                except (ValueError, TypeError) as error:
+                    response = {"ok": False, "error": str(error)}
+                if (isinstance(request, dict) and "id" in request):
+                    response["id"] = request["id"]
+                response["latency"] = time.perf_counter() - start
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.pop(connection_session, None)
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+        """
+        Returns the asyncio server listening on the Unix socket unix, or on host and port.
+        """
+        if (unix is not None):
+            return await asyncio.start_unix_server(self.handle, unix)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, workers=None, max_sessions=DEFAULT_MAX_SESSIONS,
+                session_ttl=DEFAULT_SESSION_TTL):
+    """
+    Serves until cancelled, searching in workers processes, or in threads of the event loop by default.
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else ThreadPoolExecutor()
+    server = await Server(executor, max_sessions, session_ttl).start(host, port, unix)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve the Tic Tac Toe engine over a socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, help="search in this many worker processes instead of threads")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument("--session-ttl", type=float, default=DEFAULT_SESSION_TTL,
+                        help="seconds an idle session is kept")
+    options = parser.parse_args(arguments)
+    try:
+        asyncio.run(serve(options.host, options.port, options.unix, options.workers, options.max_sessions,
+                          options.session_ttl))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Search statistics
+
+A SearchStats collects the counters of a search as it runs. Per ply counters are indexed by ply, the number of
+stones on the board, so the root of a search from the empty board is ply 0.
+Pass one to a search to read them afterwards; counters accumulate over every search run with the same object.
+"""
+
+
+class SearchStats:
+    """
+    Counters of one or more searches: nodes visited and nodes expanded (searched move by move) at each ply,
+    alpha and beta cutoffs, transposition table probes and hits, how often each tactical shortcut settled or narrowed
+    a node, moves read from the solution table instead of searched, elapsed seconds, the deepest completed depth
+    and the principal variation, as a list of cells, of the last search.
+    """
+
+    def __init__(self, size=9):
+        self.nodes = [0] * (size + 1)
+        self.expanded = [0] * (size + 1)
+        self.alpha_cutoffs = 0
+        self.beta_cutoffs = 0
+        self.probes = 0
+        self.hits = 0
+        # nodes scored without search because the mover could win at once, or faced two threats it could not block
+        self.immediate_wins = 0
+        self.forced_losses = 0
+        # nodes searched through the one cell that blocks the opponent's only threat
+        self.forced_blocks = 0
+        # moves answered from the solution table, which search nothing
+        self.book_moves = 0
+        self.elapsed = 0.0
+        self.depth = 0
+        self.pv = []
+
+    def total_nodes(self):
+        """
+        Returns the number of nodes visited at all plies.
+        """
+        return sum(self.nodes)
+
+    def branching_factors(self):
+        """
+        Returns a dict from ply to the average number of children searched by the nodes expanded at that ply.
+        """
+        return {ply: self.nodes[ply + 1] / expanded
+                for ply, expanded in enumerate(self.expanded[:-1]) if expanded}
+
+    def hit_rate(self):
+        """
+        Returns the fraction of transposition table probes that found an entry, or None if there were none.
+        """
+        if (not self.probes):
+            return None
+        return self.hits / self.probes
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dict, for logging or JSON.
+        """
+        return {
+            "nodes": self.total_nodes(),
+            "nodes_per_ply": list(self.nodes),
+            "alpha_cutoffs": self.alpha_cutoffs,
+            "beta_cutoffs": self.beta_cutoffs,
+            "branching_factors": self.branching_factors(),
+            "hit_rate": self.hit_rate(),
+            "immediate_wins": self.immediate_wins,
+            "forced_blocks": self.forced_blocks,
+            "forced_losses": self.forced_losses,
+            "book_moves": self.book_moves,
+            "elapsed": self.elapsed,
+            "depth": self.depth,
+            "pv": list(self.pv),
+        }
@@ -0,0 +1,91 @@
+"""
+Board symmetries
+
+The 3x3 board has 8 symmetries: 4 rotations, each with or without a reflection. Positions that map onto each other
+under a symmetry have the same value, so the search only needs to visit one representative of each symmetry class.
+The canonical representative of a position is the transformed (x, o) pair with the smallest position key.
+"""
+
+IDENTITY = 0
+
+# (row, col) -> (row, col) for each of the 8 transforms
+_TRANSFORMS = (
+    lambda r, c: (r, c),            # identity
+    lambda r, c: (c, 2 - r),        # rotate 90 clockwise
+    lambda r, c: (2 - r, 2 - c),    # rotate 180
+    lambda r, c: (2 - c, r),        # rotate 270 clockwise
+    lambda r, c: (r, 2 - c),        # reflect left to right
+    lambda r, c: (2 - r, c),        # reflect top to bottom
+    lambda r, c: (c, r),            # reflect in topleft to bottomright diagonal
+    lambda r, c: (2 - c, 2 - r),    # reflect in topright to bottomleft diagonal
+)
+
+# PERMUTATIONS[t][cell] is the cell that cell moves to under transform t
+PERMUTATIONS = tuple(
+    tuple(transform(cell // 3, cell % 3)[0] * 3 + transform(cell // 3, cell % 3)[1] for cell in range(9))
+    for transform in _TRANSFORMS
+)
+
+# INVERSE[t] is the transform that undoes transform t
+INVERSE = tuple(
+    next(u for u in range(8) if all(PERMUTATIONS[u][PERMUTATIONS[t][cell]] == cell for cell in range(9)))
+    for t in range(8)
+)
+
+
+def _transform_mask(mask, permutation):
+    transformed = 0
+    for cell in range(9):
+        if (mask & (1 << cell)):
+            transformed |= 1 << permutation[cell]
+    return transformed
+
+
+# MASKS[t][mask] is the 9 bit mask transformed by transform t
+MASKS = tuple(tuple(_transform_mask(mask, permutation) for mask in range(512)) for permutation in PERMUTATIONS)
+
+# canonical (key, transform) of each position seen so far, keyed by position key
+_canonical_cache = {}
+
+
+def transform_cell(cell, transform):
+    """
+    Returns the cell that cell moves to under transform.
+    """
+    return PERMUTATIONS[transform][cell]
+
+
+def transform_position(x, o, transform):
+    """
+    Returns the (x, o) pair transformed by transform.
+    """
+    masks = MASKS[transform]
+    return masks[x], masks[o]
+
+
+def canonical_key(x, o):
+    """
+    Returns (key, transform): the position key of the canonical representative of (x, o),
+    and the transform that maps (x, o) onto it.
+    """
+    key = x | (o << 9)
+    canonical = _canonical_cache.get(key)
+    if (canonical is None):
+        canonical = (key, IDENTITY)
+        for transform in range(1, 8):
+            masks = MASKS[transform]
+            transformed_key = masks[x] | (masks[o] << 9)
+            if (transformed_key < canonical[0]):
+                canonical = (transformed_key, transform)
+        _canonical_cache[key] = canonical
+    return canonical
+
+
+def canonical(x, o):
+    """
+    Returns (canonical_x, canonical_o, transform): the canonical representative of (x, o),
+    and the transform that maps (x, o) onto it.
+    A cell c of the canonical position is cell transform_cell(c, INVERSE[transform]) of (x, o).
+    """
+    key, transform = canonical_key(x, o)
+    return key & 0b111111111, key >> 9, transform
@@ -1,23 +1,32 @@
 """
 Tic Tac Toe Player
+
+Boards are lists of rows of X, O or EMPTY, or immutable bitboard.Board values; every function accepts either.
 """
 
-import math
-import copy
-import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import book
+import cache
+import mnk
+import search
+import symmetry
+from bitboard import X, O, EMPTY, Board
+
+# the rules of Tic Tac Toe as an m,n,k game
+GAME = mnk.Game(3, 3, 3)
 
-X = "X"
-O = "O"
-EMPTY = None
+# Monte Carlo tree search engine, created on first use and kept so consecutive moves reuse its tree; mcts, and
+# NumPy with it, is imported by monte_carlo so that importing this module stays cheap
+_mcts_engine = None
 
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return GAME.initial_state()
 
 
 def player(board):
@@ -29,21 +38,11 @@ def player(board):
     Any return value is acceptable if a terminal board is provided as input (i.e., the game is already over).
     """
 
-    # algorithm: count Xs and Os on board to see whose turn it is next
+    if (isinstance(board, Board)):
+        return board.player
 
-    moveCountX = 0
-    moveCountO = 0
-    for row in board:
-        for cell in row:
-            if (cell == X):
-                moveCountX += 1
-            elif (cell == O):
-                moveCountO += 1
-
-    if (moveCountX > moveCountO):
-        return O
-    else:
-        return X
+    # algorithm: look the position up in the table of every board, which compared the number of Xs and Os
+    return bitboard.POSITIONS[bitboard.ternary_index(board)][0]
 
 
 def actions(board):
@@ -58,14 +57,8 @@ def actions(board):
     """
 
     # set of possible actions, each action represented as a tuple (int row_index, int col_index)
-    possibleActions = set()
-
-    for row_index in range(3):
-        for cell_index in range(3):
-            if (board[row_index][cell_index] == EMPTY):
-                possibleActions.add((row_index, cell_index))
-
-    return possibleActions
+    empty = bitboard.POSITIONS[bitboard.ternary_index(board)][3]
+    return {bitboard.cell_action(cell) for cell in bitboard.CELLS[empty]}
 
 
 def result(board, action):
@@ -83,12 +76,17 @@ def result(board, action):
     make a deep copy of the board first before making any changes.
     """
 
+    # a Board is immutable, so it makes the new board itself
+    if (isinstance(board, Board)):
+        return board.result(action)
+
     # first check action is valid
     if (board[action[0]][action[1]] != EMPTY):
         raise Exception(f"Invalid action: {action} on board: {board}")
 
     active_player = player(board)
-    new_board = copy.deepcopy(board)
+    # cells are immutable, so copying each row is a deep copy of the board
+    new_board = [list(row) for row in board]
     new_board[action[0]][action[1]] = active_player
 
     return new_board
@@ -107,26 +105,10 @@ def winner(board):
     If there is no winner of the game (either because the game is in progress, or because it ended in a tie),
     the function should return None.
     """
-    if (row_winner(board[0], X) or
-        row_winner(board[1], X) or
-        row_winner(board[2], X) or
-        col_winner(board, 0, X) or
-        col_winner(board, 1, X) or
-        col_winner(board, 2, X) or
-        tlbr_diag_winner(board, X) or
-        trbl_diag_winner(board, X)):
-        return X
-    elif (row_winner(board[0], O) or
-          row_winner(board[1], O) or
-          row_winner(board[2], O) or
-          col_winner(board, 0, O) or
-          col_winner(board, 1, O) or
-          col_winner(board, 2, O) or
-          tlbr_diag_winner(board, O) or
-          trbl_diag_winner(board, O)):
-        return O
-    else:
-        return None
+    if (isinstance(board, Board)):
+        return board.winner
+    return bitboard.POSITIONS[bitboard.ternary_index(board)][1]
+
 
 def terminal(board):
     """
@@ -137,10 +119,9 @@ def terminal(board):
     anyone winning, the function should return True.
     Otherwise, the function should return False if the game is still in progress.
     """
-    if (winner(board) != None):
-        return True
-    else:
-        return board_full(board)
+    if (isinstance(board, Board)):
+        return board.terminal
+    return bitboard.POSITIONS[bitboard.ternary_index(board)][2]
 
 
 def utility(board):
@@ -152,16 +133,11 @@ def utility(board):
     If the game has ended in a tie, the utility is 0.
     You may assume utility will only be called on a board if terminal(board) is True.
     """
-    winning_player = winner(board)
-    if (winning_player == X):
-        return 1
-    elif (winning_player == O):
-        return -1
-    else:
-        return 0
+    position_winner = bitboard.POSITIONS[bitboard.ternary_index(board)][1]
+    return 1 if position_winner == X else (-1 if position_winner == O else 0)
 
 
-def minimax(board):
+def minimax(board, lookup=True, time_limit=None, max_depth=None, cancel=None, stats=None, on_node=None, on_depth=None):
     """
     Returns the optimal action for the current player on the board.
     Specification:
@@ -169,124 +145,120 @@ def minimax(board):
     The move returned should be the optimal action (i, j) that is one of the allowable actions on the board.
     If multiple moves are equally optimal, any of those moves is acceptable.
     If the board is a terminal board, the minimax function should return None.
+    With lookup, the move is read from the precomputed solution table, falling back to search if the table file
+    is missing or corrupt.
+    With time_limit (seconds) or max_depth, the move comes from an iterative deepening search that scores positions
+    beyond max_depth heuristically, and returns the best move found so far when time_limit runs out or the
+    threading.Event cancel is set.
+    Pass a SearchStats to read the statistics of the search afterwards; a move read from the solution table
+    searches nothing, and only counts in stats.book_moves.
+    With on_node, on_node(ply, depth, alpha, beta, searcher) is called on entering every node of either search, where
+    ply is the number of stones on the board, depth the number of moves left to search, and searcher the
+    bitboard.Context or search.Search running the search.
+    With on_depth, on_depth(depth, cell, score, stats) is called after each completed depth; the bitboard search
+    completes only the full depth.
     """
-    if (terminal(board)):
+    if (time_limit is not None or max_depth is not None):
+        if (terminal(board)):
+            return None
+        cell = search.iterative_deepening(GAME.new_state(board), time_limit, max_depth, cancel=cancel, stats=stats,
+                                          on_depth=on_depth, on_node=on_node)
+        return GAME.action(cell)
+
+    x, o = bitboard.from_board(board)
+    cell = None
+    if (lookup):
+        table = book.default_table()
+        if (table is not None):
+            cell = table.best_cell(x, o)
+            if (cell is not None and stats is not None):
+                stats.book_moves += 1
+    if (cell is None):
+        context = None
+        if (stats is not None or on_node is not None):
+            context = bitboard.Context(stats=stats, on_node=on_node)
+        cell = bitboard.minimax(x, o, context=context, on_depth=on_depth)
+    if (cell is None):
         return None
-
-    active_player = player(board)
-    optimal_action = None
-    alpha = -sys.maxsize - 1
-    beta = sys.maxsize
-
-    # print("-------------------------------------")
-    # print(f"minimax: for player: {active_player}")
-    # print_board(board)
-
-    if (active_player == X):
-        # maximising player
-        optimal_score = -sys.maxsize - 1
-        #print(f"Looking for move with highest min score...")
-        for action in actions(board):
-            score = min_value(result(board, action), alpha, beta)
-            #print(f"X Move ({action[0]},{action[1]}) gives max_value: {score}")
-            if (score > optimal_score):
-                optimal_score = score
-                optimal_action = action
-                #print(f"BEST SCORE SO FAR! - ({action[0]},{action[1]})")
-            alpha = max(alpha, score)
-            if beta <= alpha:
-                # alpha / beta pruning
-                break
-        #print(f"Choosing best move - ({optimal_action[0]},{optimal_action[1]})")
-        return optimal_action
-    else:
-        # minimising player
-        optimal_score = sys.maxsize
-        # print(f"Looking for move with lowest max score...")
-        for action in actions(board):
-            score = max_value(result(board, action), alpha, beta)
-            # print(f"O Move ({action[0]},{action[1]}) gives max_value: {score}")
-            if (score < optimal_score):
-                optimal_score = score
-                optimal_action = action
-                # print(f"BEST SCORE SO FAR! - ({action[0]},{action[1]})")
-            beta = min(beta, score)
-            if beta <= alpha:
-                # alpha / beta pruning
-                break
-        # print(f"Choosing best move - ({optimal_action[0]},{optimal_action[1]})")
-        return optimal_action
-
-
-def max_value(board, alpha, beta):
-    if terminal(board):
-        return utility(board)
-    score = -sys.maxsize - 1
-    for action in actions(board):
-        score = max(score, min_value(result(board, action), alpha, beta))
-        alpha = max(alpha, score)
-        if beta <= alpha:
-            # alpha / beta pruning
-            break
-    return score
-
-
-def min_value(board, alpha, beta):
-    if terminal(board):
-        return utility(board)
-    score = sys.maxsize
-    for action in actions(board):
-        score = min(score, max_value(result(board, action), alpha, beta))
-        beta = min(beta, score)
-        if beta <= alpha:
-            # alpha / beta pruning
-            break
-    return score
-
-
-def board_full(board):
-    for row in board:
-        for cell in row:
-            if (cell == EMPTY):
-                return False
-
-    return True
-
-
-def row_winner(row, player):
-    """
-    Return true if the player has won by placing 3 moves into the row
-    """
-    return (row[0] == player and
-            row[1] == player and
-            row[2] == player)
+    return bitboard.cell_action(cell)
 
 
-def col_winner(board, col_index, player):
+def monte_carlo(board, steps=None, time_limit=None):
     """
-    Return true if the player has won by placing 3 moves into column (col_index) of the board
+    Returns the action chosen for the current player on the board by Monte Carlo tree search, after steps tree steps
+    or time_limit seconds, whichever comes first, or None if the board is a terminal board.
+    Without steps, the search runs mcts.DEFAULT_STEPS steps, or for all of time_limit if one is given.
+    The search tree is kept between calls, so the moves of one game build on the playouts of earlier moves.
+    The engine is not seeded: create an mcts.MCTS with a seed for reproducible moves.
     """
-    return (board[0][col_index] == player and
-            board[1][col_index] == player and
-            board[2][col_index] == player)
+    global _mcts_engine
+    if (terminal(board)):
+        return None
+    import mcts
+    if (_mcts_engine is None):
+        _mcts_engine = mcts.MCTS(GAME)
+    if (steps is None and time_limit is None):
+        steps = mcts.DEFAULT_STEPS
+    return GAME.action(_mcts_engine.search(GAME.new_state(board), steps, time_limit))
 
 
-def tlbr_diag_winner(board, player):
+def solve_batch(boards, workers=None, lookup=True):
     """
-    Return true if the player has won by placing 3 moves into the topleft to bottomright diagonal of the board
+    Returns the list of optimal actions for a list of boards, in the same order, with None for terminal boards.
+    Boards are reduced to their canonical positions so each symmetry class is solved once, and the canonical
+    positions are searched through one shared transposition table. With lookup, positions are read from the
+    solution table when it is available.
+    With workers, the positions not found in the solution table are split between that many worker processes,
+    each with its own table, warmed from the persistent position cache.
     """
-    return (board[0][0] == player and
-            board[1][1] == player and
-            board[2][2] == player)
-
-
-def trbl_diag_winner(board, player):
+    canonical = []
+    for board in boards:
+        x, o = bitboard.from_board(board)
+        canonical.append(symmetry.canonical(x, o))
+
+    # one entry per distinct canonical position, in first seen order
+    positions = list(dict.fromkeys((x, o) for x, o, _ in canonical))
+    cells = {}
+    if (lookup):
+        table = book.default_table()
+        if (table is not None):
+            for x, o in positions:
+                cell = table.best_cell(x, o)
+                if (cell is not None or bitboard.terminal(x, o)):
+                    cells[(x, o)] = cell
+            positions = [position for position in positions if position not in cells]
+
+    if (workers is None or workers < 2 or len(positions) < 2):
+        cells.update(zip(positions, bitboard.solve_positions(positions)))
+    else:
+        chunks = [positions[index::workers] for index in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=cache.warm) as executor:
+            for chunk, chunk_cells in zip(chunks, executor.map(bitboard.solve_positions, chunks)):
+                cells.update(zip(chunk, chunk_cells))
+
+    actions = []
+    for x, o, transform in canonical:
+        cell = cells[(x, o)]
+        if (cell is None):
+            actions.append(None)
+        else:
+            actions.append(bitboard.cell_action(symmetry.transform_cell(cell, symmetry.INVERSE[transform])))
+    return actions
+
+
+def analyse(board):
     """
-    Return true if the player has won by placing 3 moves into the topright to bottomleft diagonal of the board
+    Returns a dict mapping every possible action (i, j) on the board to (value, plies):
+    value is the game theoretic value of taking the action (1 if X wins, -1 if O wins, 0 for a tie),
+    and plies is the number of moves, counting this one, until the game is won or lost with perfect play,
+    or None for a tie.
+    If the board is a terminal board, the dict is empty.
     """
-    return (board[0][2] == player and
-            board[1][1] == player and
-            board[2][0] == player)
+    x, o = bitboard.from_board(board)
+    analysis = {}
+    for cell, score in bitboard.analyse(x, o):
+        analysis[bitboard.cell_action(cell)] = (bitboard.score_value(score), bitboard.score_plies(x, o, score))
+    return analysis
 
 
 def print_board(board):
@@ -0,0 +1,90 @@
+"""
+Transposition table for the minimax search
+
+Different move orders reach the same position, so the search stores the value it found for each position and
+reuses it when the position comes round again. Alpha / beta pruning means a stored value is not always exact:
+a search that was cut off only proves a bound, so every entry records which kind of value it holds.
+"""
+
+from collections import OrderedDict
+
+# entry flags
+EXACT = 0
+LOWER = 1   # search failed high: the true value is at least the stored value
+UPPER = 2   # search failed low: the true value is at most the stored value
+
+DEFAULT_CAPACITY = 1 << 16
+
+
+class TranspositionTable:
+    """
+    Maps position keys to (value, flag, best_move) entries.
+    Holds at most capacity entries, evicting the least recently used entry when full.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if (capacity < 1):
+            raise ValueError(f"Invalid capacity: {capacity}")
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def probe(self, key):
+        """
+        Returns the (value, flag, best_move) entry for key, or None if there is no entry.
+        """
+        entry = self.entries.get(key)
+        if (entry is None):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key):
+        """
+        Returns the (value, flag, best_move) entry for key, or None, without counting a probe or refreshing the entry.
+        """
+        return self.entries.get(key)
+
+    def store(self, key, value, flag, best_move=None):
+        """
+        Stores an entry for key, replacing any existing entry.
+        """
+        entries = self.entries
+        if (key in entries):
+            entries.move_to_end(key)
+        elif (len(entries) >= self.capacity):
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (value, flag, best_move)
+        self.stores += 1
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the table counters as a dict.
+        """
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
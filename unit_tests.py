@@ -1,5 +1,37 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
 import unittest
-from tictactoe import X, O, EMPTY, initial_state, player, actions, result, winner, terminal, utility, minimax
+
+import arena
+import benchmark
+import bitboard
+import book
+import cache
+import gametree
+import loadgen
+import mcts
+import mnk
+import parallel
+import search
+import server
+import symmetry
+try:
+    import numpy
+    import retrograde
+except ImportError:
+    numpy = None
+from stats import SearchStats
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from tictactoe import X, O, EMPTY, initial_state, player, actions, result, winner, terminal, utility, minimax, analyse, solve_batch, \
+    monte_carlo, Board
+
+GAME_333 = mnk.Game(3, 3, 3)
+
 
 class TestTicTacToe(unittest.TestCase):
 
@@ -299,5 +331,1251 @@ class TestTicTacToe(unittest.TestCase):
         self.assertEqual(minimax(board), (2, 1))
 
 
+class TestBitboard(unittest.TestCase):
+
+    #
+    # Bitboard
+    # A position is stored as an X mask and an O mask, with cell (i, j) at bit (i * 3 + j).
+    #
+
+    def test_board_round_trip(self):
+        """Converting to a bitboard and back should give the original board."""
+        board = [[X, O, EMPTY],
+                 [O, EMPTY, X],
+                 [X, EMPTY, O]]
+        x, o = bitboard.from_board(board)
+        self.assertEqual(x, 0b001100001)
+        self.assertEqual(o, 0b100001010)
+        self.assertEqual(bitboard.to_board(x, o), board)
+
+    def test_player_from_popcount(self):
+        """X moves when both masks hold the same number of cells, otherwise O moves."""
+        self.assertEqual(bitboard.player(0, 0), X)
+        self.assertEqual(bitboard.player(0b000010000, 0), O)
+        self.assertEqual(bitboard.player(0b000010000, 0b000000001), X)
+
+    def test_win_masks(self):
+        """Every win line should be detected for either player."""
+        for line in bitboard.WIN_MASKS:
+            self.assertEqual(bitboard.winner(line, 0), X)
+            self.assertEqual(bitboard.winner(0, line), O)
+        self.assertEqual(bitboard.winner(0b001100011, 0b110011100), None)
+
+    def test_result_invalid_action(self):
+        """Taking an occupied cell should raise an exception."""
+        with self.assertRaises(Exception):
+            bitboard.result(0b000000001, 0, 0)
+
+    def test_minimax_matches_list_board(self):
+        """The bitboard search should pick the same winning move as the list-of-lists API."""
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        x, o = bitboard.from_board(board)
+        self.assertEqual(bitboard.cell_action(bitboard.minimax(x, o)), (0, 2))
+
+
+class TestTranspositionTable(unittest.TestCase):
+
+    #
+    # Transposition table
+    # Entries hold a value, whether it is exact, a lower bound or an upper bound, and the best move.
+    #
+
+    def test_probe_and_store_counters(self):
+        """Probing counts hits and misses, storing counts stores."""
+        table = TranspositionTable()
+        self.assertIsNone(table.probe(1))
+        table.store(1, 0, EXACT, 4)
+        self.assertEqual(table.probe(1), (0, EXACT, 4))
+        self.assertEqual((table.hits, table.misses, table.stores), (1, 1, 1))
+
+    def test_eviction_least_recently_used(self):
+        """When the table is full the least recently used entry is evicted."""
+        table = TranspositionTable(capacity=2)
+        table.store(1, 1, LOWER)
+        table.store(2, -1, UPPER)
+        table.probe(1)
+        table.store(3, 0, EXACT)
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.probe(2))
+        self.assertIsNotNone(table.probe(1))
+        self.assertEqual(table.evictions, 1)
+
+    def test_invalid_capacity(self):
+        """A table must be able to hold at least one entry."""
+        with self.assertRaises(ValueError):
+            TranspositionTable(capacity=0)
+
+    def test_minimax_repeat_search_is_a_probe(self):
+        """Searching the same position twice answers the second search from the root entry."""
+        table = TranspositionTable()
+        first = bitboard.minimax(0, 0, table)
+        stores = table.stores
+        self.assertEqual(bitboard.minimax(0, 0, table), first)
+        self.assertEqual(table.stores, stores)
+
+    def test_minimax_small_table_stays_correct(self):
+        """Evictions must not change the result of the search."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        x, o = bitboard.from_board(board)
+        self.assertEqual(bitboard.cell_action(bitboard.minimax(x, o, TranspositionTable(capacity=8))), (2, 1))
+
+
+class TestSymmetry(unittest.TestCase):
+
+    #
+    # Symmetry
+    # Positions that map onto each other under one of the 8 board symmetries share a canonical representative.
+    #
+
+    def test_inverse_transforms(self):
+        """Every transform followed by its inverse leaves every cell where it was."""
+        for transform in range(8):
+            for cell in range(9):
+                moved = symmetry.transform_cell(cell, transform)
+                self.assertEqual(symmetry.transform_cell(moved, symmetry.INVERSE[transform]), cell)
+
+    def test_corner_openings_share_canonical_position(self):
+        """All four corner openings are the same position up to symmetry."""
+        keys = {symmetry.canonical_key(bitboard.BIT[cell], 0)[0] for cell in (0, 2, 6, 8)}
+        self.assertEqual(len(keys), 1)
+
+    def test_canonical_transform_maps_position(self):
+        """The returned transform maps the position onto its canonical representative."""
+        x, o = bitboard.from_board([[EMPTY, EMPTY, X],
+                                    [EMPTY, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        canonical_x, canonical_o, transform = symmetry.canonical(x, o)
+        self.assertEqual(symmetry.transform_position(x, o, transform), (canonical_x, canonical_o))
+
+    def test_root_expands_distinct_openings(self):
+        """The empty board has 3 symmetry distinct moves: corner, edge and centre."""
+        self.assertEqual(len(bitboard.root_cells(0, 0)), 3)
+
+    def test_minimax_maps_move_back(self):
+        """The best move found on the canonical position is returned in the caller's orientation."""
+        board = [[EMPTY, EMPTY, EMPTY],
+                 [EMPTY, O, O],
+                 [EMPTY, X, X]]
+        x, o = bitboard.from_board(board)
+        self.assertEqual(bitboard.cell_action(bitboard.minimax(x, o, TranspositionTable())), (2, 0))
+
+
+class TestSolutionTable(unittest.TestCase):
+
+    #
+    # Solution table
+    # Every reachable position is solved once and stored in a binary file read through a memory map.
+    #
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "solution.bin")
+        book.generate(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_lookup_initial(self):
+        """The empty board is a tie, and every cell is an optimal first move."""
+        table = book.load(self.path)
+        self.assertEqual(table.lookup(0, 0), (0, bitboard.FULL))
+        table.close()
+
+    def test_lookup_quickest_win(self):
+        """Optimal moves win as quickly as possible."""
+        x, o = bitboard.from_board([[X, X, EMPTY],
+                                    [O, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        table = book.load(self.path)
+        self.assertEqual(table.lookup(x, o), (1, bitboard.BIT[2]))
+        table.close()
+
+    def test_lookup_terminal(self):
+        """Terminal positions have no entry."""
+        x, o = bitboard.from_board([[X, O, X],
+                                    [O, O, X],
+                                    [X, X, O]])
+        table = book.load(self.path)
+        self.assertIsNone(table.lookup(x, o))
+        self.assertIsNone(table.best_cell(x, o))
+        table.close()
+
+    def test_load_missing(self):
+        """A missing file loads as None."""
+        self.assertIsNone(book.load(os.path.join(self.directory.name, "missing.bin")))
+
+    def test_load_corrupt(self):
+        """A file that fails its checksum loads as None."""
+        path = os.path.join(self.directory.name, "corrupt.bin")
+        book.generate(path)
+        with open(path, "r+b") as file:
+            file.seek(book.HEADER.size + 100)
+            file.write(b"\xff")
+        self.assertIsNone(book.load(path))
+
+    def test_minimax_lookup_matches_search(self):
+        """Lookup mode and search mode agree on forced moves."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(minimax(board, lookup=True), (2, 1))
+        self.assertEqual(minimax(board, lookup=False), (2, 1))
+
+
+class TestAnalyse(unittest.TestCase):
+
+    #
+    # Analyse
+    # The analyse function should return every possible action with its value and distance to the end of the game.
+    #
+
+    def test_analyse_initial(self):
+        """Every first move leads to a tie with perfect play."""
+        analysis = analyse(initial_state())
+        self.assertEqual(set(analysis), actions(initial_state()))
+        self.assertEqual(set(analysis.values()), {(0, None)})
+
+    def test_analyse_midgame(self):
+        """Values and plies to the win or loss for every possible action."""
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(analyse(board), {(0, 2): (1, 1),
+                                          (1, 2): (0, None),
+                                          (2, 0): (-1, 2),
+                                          (2, 1): (-1, 2),
+                                          (2, 2): (-1, 2)})
+
+    def test_analyse_terminal(self):
+        """A terminal board has no actions to analyse."""
+        board = [[X, O, X],
+                 [O, O, X],
+                 [O, X, X]]
+        self.assertEqual(analyse(board), {})
+
+
+class TestMNK(unittest.TestCase):
+
+    #
+    # m,n,k games
+    # The first player to place k stones in a row on an m by n board wins.
+    #
+
+    def test_line_counts(self):
+        """Every run of k cells in each of the four directions is a line."""
+        self.assertEqual(len(mnk.Game(3, 3, 3).lines), 8)
+        self.assertEqual(len(mnk.Game(4, 4, 4).lines), 10)
+        self.assertEqual(len(mnk.Game(5, 5, 4).lines), 28)
+
+    def test_invalid_game(self):
+        """k cannot be longer than the board."""
+        with self.assertRaises(ValueError):
+            mnk.Game(3, 3, 4)
+
+    def test_incremental_win(self):
+        """Completing a line through the last placed stone wins the game."""
+        game = mnk.Game(5, 5, 4)
+        state = game.new_state()
+        for cell in (1, 5, 2, 10, 8, 15, 24):
+            self.assertIsNone(state.winner)
+            state.make(cell)
+        self.assertIsNone(state.winner)
+        state.make(20)
+        self.assertEqual(state.winner, O)
+        self.assertTrue(state.terminal())
+
+    def test_unmake_restores_state(self):
+        """Unmaking a winning move clears the winner and the line counts."""
+        game = mnk.Game(15, 15, 5)
+        state = game.new_state()
+        for cell in (0, 15, 1, 16, 2, 17, 3, 18, 4):
+            state.make(cell)
+        self.assertEqual(state.winner, X)
+        for _ in range(9):
+            state.unmake()
+        self.assertIsNone(state.winner)
+        self.assertEqual(state.cells, [EMPTY] * 225)
+        self.assertEqual(state.counts, game.new_state().counts)
+
+    def test_state_from_board(self):
+        """A state built from a board agrees with the full board winner check."""
+        board = [[X, X, O],
+                 [EMPTY, O, X],
+                 [O, EMPTY, EMPTY]]
+        game = mnk.Game(3, 3, 3)
+        state = game.new_state(board)
+        self.assertEqual(state.winner, O)
+        self.assertEqual(game.winner(board), O)
+        self.assertEqual(state.to_board(), board)
+
+    def test_tictactoe_front_end(self):
+        """Tic Tac Toe is the 3,3,3 game."""
+        self.assertEqual(initial_state(), mnk.Game(3, 3, 3).initial_state())
+        self.assertEqual(len(actions(initial_state())), 9)
+
+
+class TestMakeUnmakeSearch(unittest.TestCase):
+
+    #
+    # Make / unmake search
+    # The search plays and takes back moves on one mutable state instead of copying boards.
+    #
+
+    def test_state_unchanged_after_search(self):
+        """The state is left as it was found."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        state = mnk.Game(3, 3, 3).new_state(board)
+        self.assertEqual(mnk.Game(3, 3, 3).action(search.minimax(state)), (2, 1))
+        self.assertEqual(state.to_board(), board)
+        self.assertEqual(len(state.history), 3)
+
+    def test_take_immediate_win(self):
+        """The search takes an immediate win on larger boards."""
+        game = mnk.Game(4, 4, 3)
+        state = game.new_state([[X, X, EMPTY, EMPTY],
+                                [O, O, EMPTY, EMPTY],
+                                [EMPTY, EMPTY, EMPTY, EMPTY],
+                                [EMPTY, EMPTY, EMPTY, EMPTY]])
+        self.assertEqual(game.action(search.minimax(state)), (0, 2))
+
+    def test_terminal(self):
+        """A finished game has no move."""
+        state = mnk.Game(3, 3, 3).new_state([[X, O, X],
+                                             [O, O, X],
+                                             [O, X, X]])
+        self.assertIsNone(search.minimax(state))
+
+    def test_result_does_not_share_rows(self):
+        """result() still returns a board that shares no rows with the original."""
+        board = initial_state()
+        new_board = result(board, (1, 1))
+        for row, new_row in zip(board, new_board):
+            self.assertIsNot(row, new_row)
+
+
+class TestIterativeDeepening(unittest.TestCase):
+
+    #
+    # Iterative deepening
+    # Depth and time limited searches return the best move found so far.
+    #
+
+    def test_max_depth_takes_immediate_win(self):
+        """A one ply search sees an immediate win."""
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(minimax(board, max_depth=1), (0, 2))
+
+    def test_max_depth_terminal(self):
+        """If the board is a terminal board, the minimax function should return None."""
+        board = [[X, O, X],
+                 [O, O, X],
+                 [O, X, X]]
+        self.assertEqual(minimax(board, max_depth=3), None)
+
+    def test_unlimited_matches_full_search(self):
+        """With no limits the search runs until the outcome is proven."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(GAME_333.action(search.iterative_deepening(GAME_333.new_state(board))), (2, 1))
+
+    def test_time_limit(self):
+        """A search on a large board stops close to its time limit with a legal move."""
+        game = mnk.Game(7, 7, 5)
+        state = game.new_state()
+        start = time.perf_counter()
+        cell = search.iterative_deepening(state, time_limit=0.05)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(cell, range(game.size))
+        self.assertEqual(state.history, [])
+
+    def test_cancel(self):
+        """A cancelled search stops at its next clock check and still returns a legal move."""
+        game = mnk.Game(7, 7, 5)
+        state = game.new_state()
+        cancel = threading.Event()
+        cancel.set()
+        start = time.perf_counter()
+        cell = search.iterative_deepening(state, time_limit=60, cancel=cancel)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertIn(cell, range(game.size))
+        self.assertEqual(state.history, [])
+
+    def test_pluggable_evaluation(self):
+        """Positions at the depth limit are scored by the evaluation passed in."""
+        evaluated = []
+
+        def count_evaluations(state):
+            evaluated.append(len(state.history))
+            return 0
+
+        search.minimax(GAME_333.new_state(), max_depth=2, evaluate=count_evaluations)
+        self.assertTrue(evaluated)
+        self.assertEqual(set(evaluated), {2})
+
+
+class TestMoveOrdering(unittest.TestCase):
+
+    #
+    # Move ordering
+    # Wins, blocks, the stored best move and killer moves are searched first, then the rest by history score.
+    #
+
+    def test_static_order(self):
+        """With nothing else to go on, centre comes first, then corners, then edges."""
+        context = bitboard.Context(TranspositionTable())
+        self.assertEqual(bitboard.ordered_cells(0, 0, bitboard.FULL, 0, 0, None, context),
+                         [4, 0, 2, 6, 8, 1, 3, 5, 7])
+
+    def test_wins_then_blocks(self):
+        """A winning cell is searched first, then a cell that blocks the opponent's win."""
+        x, o = bitboard.from_board([[X, X, EMPTY],
+                                    [O, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        empty = bitboard.FULL ^ (x | o)
+        context = bitboard.Context(TranspositionTable())
+        self.assertEqual(bitboard.ordered_cells(x, o, empty, 4, 0, None, context)[:2], [2, 5])
+
+    def test_killers_and_history(self):
+        """Cells that caused cutoffs are tried before other quiet cells."""
+        context = bitboard.Context(TranspositionTable())
+        context.cutoff(0, 0, 7, 9)
+        context.cutoff(2, 0, 5, 7)
+        ordered = bitboard.ordered_cells(0, 0, bitboard.FULL, 0, 0, None, context)
+        self.assertEqual(ordered[:2], [7, 5])
+
+    def test_node_counter(self):
+        """The context counts the nodes of a search, and ordering keeps the empty board search small."""
+        context = bitboard.Context(TranspositionTable())
+        bitboard.minimax(0, 0, context=context)
+        self.assertGreater(context.nodes, 0)
+        self.assertLess(context.nodes, 1000)
+
+
+class TestSolveBatch(unittest.TestCase):
+
+    #
+    # Batched solving
+    # The solve_batch function should return the optimal action for every board, in input order.
+    #
+
+    BOARDS = [
+        [[X, X, EMPTY],
+         [O, O, EMPTY],
+         [EMPTY, EMPTY, EMPTY]],
+        [[X, O, X],
+         [O, O, X],
+         [O, X, X]],
+        [[O, X, EMPTY],
+         [EMPTY, X, EMPTY],
+         [EMPTY, EMPTY, EMPTY]],
+        [[EMPTY, X, X],
+         [EMPTY, O, O],
+         [EMPTY, EMPTY, EMPTY]],
+    ]
+
+    def test_input_order(self):
+        """Answers come back in input order, with None for terminal boards."""
+        self.assertEqual(solve_batch(self.BOARDS, lookup=False), [(0, 2), None, (2, 1), (0, 0)])
+
+    def test_symmetric_boards_mapped_back(self):
+        """Boards in the same symmetry class are solved once and answered in their own orientation."""
+        self.assertEqual(solve_batch([self.BOARDS[0], self.BOARDS[3]], lookup=False), [(0, 2), (0, 0)])
+
+    def test_lookup_matches_search(self):
+        """Answers from the solution table agree on forced moves."""
+        self.assertEqual(solve_batch(self.BOARDS), solve_batch(self.BOARDS, lookup=False))
+
+    def test_worker_processes(self):
+        """Splitting positions across worker processes gives the same answers."""
+        self.assertEqual(solve_batch(self.BOARDS, workers=2, lookup=False), [(0, 2), None, (2, 1), (0, 0)])
+
+
+@unittest.skipUnless(numpy, "retrograde analysis needs numpy")
+class TestRetrograde(unittest.TestCase):
+
+    #
+    # Retrograde analysis
+    # Every board is solved at once by propagating scores back from the full boards.
+    #
+
+    @classmethod
+    def setUpClass(cls):
+        cls.game = mnk.Game(3, 3, 3)
+        cls.scores = retrograde.solve(cls.game)
+
+    def test_valid_positions(self):
+        """Exactly the 5478 positions reachable in a game are valid."""
+        self.assertEqual(int((self.scores != retrograde.INVALID).sum()), 5478)
+
+    def test_initial_tie(self):
+        """Tic Tac Toe is a tie with perfect play."""
+        self.assertEqual(retrograde.value(self.scores, self.game, initial_state()), 0)
+
+    def test_matches_solution_table(self):
+        """Values agree with the solution table for every reachable, non-terminal position."""
+        table = book.load()
+        for index in range(3 ** 9):
+            x = sum(bitboard.BIT[cell] for cell in range(9) if (index // 3 ** cell) % 3 == 1)
+            o = sum(bitboard.BIT[cell] for cell in range(9) if (index // 3 ** cell) % 3 == 2)
+            entry = table.lookup(x, o)
+            if (entry is not None):
+                self.assertEqual(retrograde.value(self.scores, self.game, bitboard.to_board(x, o)), entry[0])
+
+    def test_invalid_board(self):
+        """Boards where a player has moved out of turn are invalid."""
+        board = [[X, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertIsNone(retrograde.value(self.scores, self.game, board))
+
+    def test_rectangular_board(self):
+        """The same code solves other m,n,k games."""
+        game = mnk.Game(3, 4, 3)
+        self.assertEqual(retrograde.value(retrograde.solve(game), game, game.initial_state()), 1)
+
+
+class TestParallelSearch(unittest.TestCase):
+
+    #
+    # Parallel root split
+    # Root moves are searched in worker processes and the serial search's move is returned.
+    #
+
+    def test_matches_serial_full_depth(self):
+        """A full depth parallel search returns the serial search's move."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        state = GAME_333.new_state(board)
+        self.assertEqual(parallel.parallel_minimax(state, workers=2), search.minimax(state))
+        self.assertEqual(state.to_board(), board)
+
+    def test_matches_serial_depth_limited(self):
+        """A depth limited parallel search returns the serial search's move, including among tied moves."""
+        game = mnk.Game(4, 4, 4)
+        for board in (game.initial_state(),
+                      [[X, EMPTY, EMPTY, EMPTY],
+                       [EMPTY, O, EMPTY, EMPTY],
+                       [EMPTY, EMPTY, X, EMPTY],
+                       [EMPTY, EMPTY, EMPTY, EMPTY]]):
+            state = game.new_state(board)
+            self.assertEqual(parallel.parallel_minimax(state, workers=2, max_depth=3), search.minimax(state, 3))
+
+    def test_terminal(self):
+        """A finished game has no move."""
+        state = GAME_333.new_state([[X, O, X],
+                                    [O, O, X],
+                                    [O, X, X]])
+        self.assertIsNone(parallel.parallel_minimax(state, workers=2))
+
+
+class TestBenchmark(unittest.TestCase):
+
+    #
+    # Benchmark suite
+    # The corpus is fixed, every position is measured and slow-downs are flagged against a baseline.
+    #
+
+    def test_corpus(self):
+        """The corpus holds the empty board and all nine openings."""
+        names = [name for name, _ in benchmark.corpus()]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("empty", names)
+        self.assertEqual(len([name for name in names if name.startswith("opening")]), 9)
+
+    def test_search_measurements(self):
+        """Searching the empty board visits the same nodes as a cold start bitboard search."""
+        measurements = benchmark.bench_search(initial_state(), 1)
+        context = bitboard.Context(TranspositionTable())
+        bitboard.minimax(0, 0, context=context)
+        self.assertEqual(measurements["nodes"], context.nodes)
+        self.assertGreater(measurements["seconds"], 0)
+        self.assertGreater(measurements["peak_bytes"], 0)
+
+    def test_compare(self):
+        """Only times slower by more than the threshold are regressions."""
+        baseline = {"search": {"empty": {"seconds": 1.0}}, "functions": {"winner": 1.0}}
+        faster = {"search": {"empty": {"seconds": 0.5}}, "functions": {"winner": 1.05}}
+        slower = {"search": {"empty": {"seconds": 1.5}}, "functions": {"winner": 1.0, "result": 1.0}}
+        self.assertFalse(benchmark.compare(baseline, faster, 0.1)[1])
+        lines, regressed = benchmark.compare(baseline, slower, 0.1)
+        self.assertTrue(regressed)
+        self.assertEqual(len(lines), 3)
+
+
+class TestSearchStats(unittest.TestCase):
+
+    #
+    # Search statistics
+    # Searches fill in a SearchStats, and the hooks are called per node and per completed depth.
+    #
+
+    def test_bitboard_stats(self):
+        """A cold bitboard search of the empty board counts its nodes per ply and reads back a full line of play."""
+        stats = SearchStats()
+        context = bitboard.Context(TranspositionTable(), stats)
+        cell = bitboard.minimax(0, 0, context=context)
+        self.assertEqual(stats.nodes[0], 1)
+        self.assertEqual(stats.total_nodes(), context.nodes)
+        self.assertGreater(stats.alpha_cutoffs + stats.beta_cutoffs, 0)
+        self.assertEqual(stats.pv[0], cell)
+        self.assertEqual(len(stats.pv), 9)
+        self.assertEqual(stats.depth, 9)
+        self.assertTrue(0 < stats.hit_rate() < 1)
+        self.assertEqual(stats.branching_factors()[0], stats.nodes[1])
+
+    def test_iterative_deepening_stats(self):
+        """Iterative deepening reports every completed depth, and the per node hook sees every node."""
+        state = GAME_333.new_state()
+        stats = SearchStats(GAME_333.size)
+        depths = []
+        visited = []
+        cell = search.iterative_deepening(state, max_depth=3, stats=stats,
+                                          on_depth=lambda depth, cell, score, stats: depths.append((depth, cell)),
+                                          on_node=lambda ply, depth, alpha, beta, searcher: visited.append(ply))
+        self.assertEqual([depth for depth, _ in depths], [1, 2, 3])
+        self.assertEqual(depths[-1][1], cell)
+        self.assertEqual(stats.depth, 3)
+        self.assertEqual(len(stats.pv), 3)
+        self.assertEqual(stats.pv[0], cell)
+        self.assertEqual(len(visited), stats.total_nodes())
+        self.assertIsNone(stats.hit_rate())
+        self.assertEqual(state.to_board(), initial_state())
+
+    def test_no_hook(self):
+        """Without on_node the search runs the plain methods."""
+        searcher = search.Search(GAME_333.new_state())
+        self.assertNotIn("max_value", vars(searcher))
+        self.assertNotIn("min_value", vars(searcher))
+
+    def test_minimax_stats(self):
+        """tictactoe.minimax fills in the stats of the search it runs."""
+        stats = SearchStats()
+        minimax(initial_state(), lookup=False, stats=stats)
+        self.assertEqual(len(stats.as_dict()["nodes_per_ply"]), 10)
+
+    def test_bitboard_hooks(self):
+        """The bitboard search calls on_node on entering every node below the root, and on_depth once at the end."""
+        stats = SearchStats()
+        nodes = []
+        depths = []
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        context = bitboard.Context(TranspositionTable(), stats, on_node=lambda ply, depth, alpha, beta, searcher:
+                                   nodes.append((ply, depth)))
+        x, o = bitboard.from_board(board)
+        cell = bitboard.minimax(x, o, context=context,
+                                on_depth=lambda depth, cell, score, stats: depths.append((depth, cell, score)))
+        self.assertEqual(len(nodes), stats.total_nodes() - 1)
+        self.assertTrue(all(ply > 3 and ply + depth == 9 for ply, depth in nodes))
+        self.assertEqual(depths, [(6, cell, dict(bitboard.analyse(x, o, TranspositionTable()))[cell])])
+
+    def test_minimax_hooks(self):
+        """tictactoe.minimax passes its hooks to the bitboard search, and marks moves read from the solution table."""
+        visited = []
+        depths = []
+        stats = SearchStats()
+        minimax(initial_state(), lookup=False, stats=stats, on_node=lambda *arguments: visited.append(arguments),
+                on_depth=lambda depth, cell, score, stats: depths.append(depth))
+        self.assertEqual(len(visited), stats.total_nodes() - 1)
+        self.assertEqual(depths, [9])
+        self.assertEqual(stats.book_moves, 0)
+
+        # both searches call the hook with the same arguments
+        deepening = []
+        minimax(initial_state(), max_depth=2, on_node=lambda *arguments: deepening.append(arguments))
+        for calls, searcher_type in ((visited, bitboard.Context), (deepening, search.Search)):
+            ply, depth, alpha, beta, searcher = calls[-1]
+            self.assertIsInstance(searcher, searcher_type)
+            self.assertTrue(1 <= ply <= 9 and depth >= 0)
+
+        stats = SearchStats()
+        minimax(initial_state(), stats=stats)
+        if (book.default_table() is not None):
+            self.assertEqual((stats.book_moves, stats.total_nodes()), (1, 0))
+        else:
+            self.assertGreater(stats.total_nodes(), 0)
+
+
+class TestGameTree(unittest.TestCase):
+
+    #
+    # Game tree enumeration
+    # The streaming walker counts the known Tic Tac Toe totals and leaves the state as it found it.
+    #
+
+    def test_tictactoe_statistics(self):
+        """The Tic Tac Toe tree has 255,168 games and 5,478 unique positions, 958 of them terminal."""
+        results = gametree.statistics(GAME_333)
+        self.assertEqual(results["games"], 255168)
+        self.assertEqual((results["x_wins"], results["o_wins"], results["draws"]), (131184, 77904, 46080))
+        self.assertEqual(results["positions_per_ply"], [1, 9, 72, 252, 756, 1260, 1520, 1140, 390, 78])
+        self.assertEqual(results["terminal_positions"], 958)
+        self.assertEqual(results["terminal_draws"], 16)
+
+    def test_max_plies(self):
+        """A walk cut off at max_plies counts the lines of play it stopped."""
+        results = gametree.statistics(GAME_333, max_plies=2)
+        self.assertEqual(results["games"], 0)
+        self.assertEqual(results["unfinished"], 72)
+        self.assertEqual(results["positions"], 1 + 9 + 72)
+
+    def test_games_stream(self):
+        """Game records replay to their results, and the walked state is restored."""
+        state = GAME_333.new_state([[X, O, X],
+                                    [EMPTY, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        records = list(gametree.games(state))
+        self.assertTrue(records)
+        for moves, winner in records:
+            replay = GAME_333.new_state()
+            for cell in moves:
+                replay.make(cell)
+            self.assertTrue(replay.terminal())
+            self.assertEqual(replay.winner, winner)
+        self.assertEqual(len(state.history), 4)
+        self.assertEqual(state.cells[:3], [X, O, X])
+
+    def test_positions_unique(self):
+        """The deduplicated walk yields each position once."""
+        positions = list(gametree.positions(GAME_333.new_state()))
+        self.assertEqual(len(positions), 5478)
+        self.assertEqual(len(set(positions)), 5478)
+
+    def test_visited_bitmap(self):
+        """The bitmap reports new positions once, and refuses boards too large to hold."""
+        visited = gametree.VisitedBitmap(9)
+        self.assertTrue(visited.add(12345))
+        self.assertFalse(visited.add(12345))
+        self.assertIn(12345, visited)
+        self.assertNotIn(12346, visited)
+        with self.assertRaises(ValueError):
+            gametree.VisitedBitmap(25)
+
+
+class TestPositionCache(unittest.TestCase):
+
+    #
+    # Persistent position cache
+    # Transposition table entries survive a round trip through the database, and a changed fingerprint drops them.
+    #
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "positions.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """A saved table warms an empty table to the same entries, and a warm search searches nothing."""
+        table = TranspositionTable()
+        bitboard.minimax(0, 0, table)
+        self.assertEqual(cache.save(table, self.path), len(table))
+
+        warmed = TranspositionTable()
+        self.assertEqual(cache.warm(warmed, self.path), len(table))
+        for key, entry in table.entries.items():
+            self.assertEqual(warmed.peek(key), entry)
+        context = bitboard.Context(warmed)
+        self.assertEqual(bitboard.minimax(0, 0, context=context), bitboard.minimax(0, 0, table))
+        self.assertEqual(context.nodes, 0)
+
+    def test_missing(self):
+        """Warming from a missing cache loads nothing and does not create it."""
+        self.assertEqual(cache.warm(TranspositionTable(), self.path), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_version_change(self):
+        """Entries stored under another fingerprint are ignored by readers and deleted by the next writer."""
+        writer = cache.PositionCache(self.path, writable=True, version="old")
+        table = TranspositionTable()
+        table.store(1, 2, EXACT, 3)
+        writer.save(table)
+        writer.close()
+
+        reader = cache.PositionCache(self.path, version="new")
+        self.assertFalse(reader.current)
+        self.assertIsNone(reader.get(1))
+        self.assertEqual(reader.load(TranspositionTable()), 0)
+        reader.close()
+
+        writer = cache.PositionCache(self.path, writable=True, version="new")
+        self.assertEqual(len(writer), 0)
+        writer.close()
+
+    def test_exact_kept(self):
+        """A bound never replaces an exact entry, and concurrent readers see the same entry."""
+        table = TranspositionTable()
+        table.store(7, 4, EXACT, 2)
+        cache.save(table, self.path)
+        table.store(7, 1, LOWER, 5)
+        cache.save(table, self.path)
+        readers = [cache.PositionCache(self.path) for _ in range(2)]
+        for reader in readers:
+            self.assertEqual(reader.get(7), (4, EXACT, 2))
+            reader.close()
+
+    def test_fingerprint(self):
+        """The fingerprint depends on the cache version."""
+        self.assertEqual(cache.fingerprint(), cache.fingerprint())
+        self.assertNotEqual(cache.fingerprint(), cache.fingerprint(cache.VERSION + 1))
+
+
+class TestArena(unittest.TestCase):
+
+    #
+    # Self-play arena
+    # Engines play each other headless, perfect play always draws and results add up.
+    #
+
+    def test_perfect_play_draws(self):
+        """Full search against the solution table draws every game."""
+        results = arena.match("minimax", "book", games=4, workers=1)
+        for result in results["engines"]:
+            self.assertEqual(result["draws"], 4)
+            self.assertGreater(result["moves"], 0)
+
+    def test_minimax_never_loses(self):
+        """Full search never loses to random moves, in worker processes."""
+        results = arena.match("minimax", "random", games=20, workers=2, seed=0)
+        first, second = results["engines"]
+        self.assertEqual(first["losses"], 0)
+        self.assertEqual(first["wins"] + first["draws"], 20)
+        self.assertEqual((second["wins"], second["draws"], second["losses"]),
+                         (first["losses"], first["draws"], first["wins"]))
+        self.assertGreater(results["games_per_second"], 0)
+
+    def test_seeded(self):
+        """Random games with the same seed are the same."""
+        first = arena.match("random", "depth:1", games=6, workers=1, seed=3)
+        second = arena.match("random", "depth:1", games=6, workers=1, seed=3)
+        self.assertEqual([result["wins"] for result in first["engines"]],
+                         [result["wins"] for result in second["engines"]])
+
+    def test_seeded_monte_carlo(self):
+        """Monte Carlo games with the same seed are the same, move for move."""
+        games = []
+        for _ in range(2):
+            moves = []
+
+            def recorded(engine_function):
+                def move(board, rng):
+                    moves.append(engine_function(board, rng))
+                    return moves[-1]
+                return move
+            arena.play_game(recorded(arena.engine("mcts:20")), recorded(arena.engine("random")), random.Random(5))
+            games.append(moves)
+        self.assertEqual(games[0], games[1])
+
+    def test_unknown_engine(self):
+        """Unknown engine specs are refused."""
+        for spec in ("alphabeta", "depth:", "depth:0", "random:2"):
+            with self.assertRaises(ValueError):
+                arena.engine(spec)
+
+
+class TestServer(unittest.TestCase):
+
+    #
+    # Engine server
+    # Sessions play over a socket, pending searches of the same position are shared and errors are reported.
+    #
+
+    def exchange(self, requests, **options):
+        """Sends requests over one connection to a fresh server, made with options, and returns the responses."""
+        async def run():
+            engine_server = server.Server(**options)
+            listener = await engine_server.start(port=0)
+            host, port = listener.sockets[0].getsockname()[:2]
+            reader, writer = await asyncio.open_connection(host, port)
+            responses = []
+            for request in requests:
+                writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b"\n")
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+            return responses
+        return asyncio.run(run())
+
+    def test_session(self):
+        """A session game is started, moved and answered by the engine."""
+        responses = self.exchange([{"op": "new", "id": 1},
+                                   {"op": "move", "action": [1, 1]},
+                                   {"op": "play"},
+                                   {"op": "best"}])
+        self.assertTrue(all(response["ok"] for response in responses))
+        self.assertEqual(responses[0]["id"], 1)
+        board = responses[2]["board"]
+        self.assertEqual(sum(cell is not None for row in board for cell in row), 2)
+        self.assertEqual(board[1][1], X)
+        self.assertIn(tuple(responses[3]["action"]), actions(board))
+        self.assertGreaterEqual(responses[3]["latency"], 0)
+
+    def test_errors(self):
+        """Bad requests are answered with an error and the connection keeps serving."""
+        responses = self.exchange(["not json",
+                                   {"op": "move", "action": [0, 0]},
+                                   {"op": "new"},
+                                   {"op": "move", "action": [3, 0]},
+                                   {"op": "solve", "board": [[X, X, EMPTY], [EMPTY] * 3, [EMPTY] * 3]},
+                                   {"op": "unknown"},
+                                   {"op": "solve", "board": initial_state()}])
+        self.assertEqual([response["ok"] for response in responses], [False, False, True, False, False, False, True])
+
+    def test_session_lifetime(self):
+        """Named sessions end on request, and the least recently used beyond the maximum are dropped."""
+        responses = self.exchange([{"op": "new", "session": "a"},
+                                   {"op": "end", "session": "a"},
+                                   {"op": "best", "session": "a"},
+                                   {"op": "new", "session": "a"},
+                                   {"op": "new", "session": "b"},
+                                   {"op": "move", "session": "a", "action": [1, 1]},
+                                   {"op": "new", "session": "c"},
+                                   {"op": "best", "session": "b"},
+                                   {"op": "best", "session": "a"},
+                                   {"op": "stats"}], max_sessions=2)
+        self.assertEqual([response["ok"] for response in responses],
+                         [True, True, False, True, True, True, True, False, True, True])
+        self.assertEqual((responses[-1]["sessions"], responses[-1]["expired"]), (2, 1))
+
+    def test_session_ttl(self):
+        """Sessions idle for longer than the TTL are dropped."""
+        engine_server = server.Server(session_ttl=60)
+        engine_server.set_session("a", initial_state())
+        engine_server.set_session("b", initial_state())
+        engine_server.expire_sessions(time.monotonic() + 30)
+        self.assertEqual(len(engine_server.sessions), 2)
+        engine_server.expire_sessions(time.monotonic() + 90)
+        self.assertEqual((len(engine_server.sessions), engine_server.expired), (0, 2))
+
+    def test_coalesce(self):
+        """Concurrent requests for symmetric positions share one search, each answered in its own orientation."""
+        boards = [[[X, EMPTY, EMPTY], [EMPTY, O, EMPTY], [EMPTY, EMPTY, EMPTY]],
+                  [[EMPTY, EMPTY, X], [EMPTY, O, EMPTY], [EMPTY, EMPTY, EMPTY]],
+                  [[EMPTY, EMPTY, EMPTY], [EMPTY, O, EMPTY], [EMPTY, EMPTY, X]]]
+
+        async def run():
+            engine_server = server.Server()
+            results = await asyncio.gather(*(engine_server.best_action(board) for board in boards))
+            return engine_server, results
+        engine_server, results = asyncio.run(run())
+        self.assertEqual((engine_server.searches, engine_server.coalesced), (1, 2))
+        self.assertFalse(engine_server.pending)
+        for board, action in zip(boards, results):
+            scores = dict(analyse(board))
+            self.assertEqual(scores[action][0], max(value for value, _ in scores.values()))
+
+    def test_load_generator(self):
+        """The load generator sends every request and reports its latencies."""
+        results, stats = asyncio.run(loadgen.run_local(connections=3, requests=5, pool=4, seed=0))
+        self.assertEqual(results["requests"], 15)
+        self.assertLessEqual(results["round_trip_p50"], results["round_trip_p99"])
+        self.assertEqual(stats["searches"] + stats["coalesced"], 15)
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    #
+    # Monte Carlo tree search
+    # Playouts in batches or one by one find the tactical moves, and the tree is reused between moves.
+    #
+
+    def engines(self):
+        engines = [mcts.MCTS(GAME_333, seed=0, vectorised=False)]
+        if (mcts.np is not None):
+            engines.append(mcts.MCTS(GAME_333, seed=0))
+        return engines
+
+    def test_take_immediate_win(self):
+        """The search takes a winning move."""
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        for engine in self.engines():
+            self.assertEqual(engine.search(GAME_333.new_state(board), 300), 2)
+
+    def test_prevent_immediate_loss(self):
+        """The search blocks the opponent's win."""
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        for engine in self.engines():
+            state = GAME_333.new_state(board)
+            self.assertEqual(engine.search(state, 300), 7)
+            self.assertEqual(state.to_board(), board)
+
+    def test_forced_block_large_board(self):
+        """On 7x7 with k=4, the default search finds the one cell that stops an open three."""
+        game = mnk.Game(7, 7, 4)
+        state = game.new_state()
+        for cell in (22, 0, 23, 21, 24):
+            state.make(cell)
+        self.assertEqual(mcts.MCTS(game, seed=0).search(state), 25)
+
+    def test_rollouts(self):
+        """Playouts from a finished game all end in its result, and from a real position add up to the batch."""
+        state = GAME_333.new_state([[X, X, X],
+                                    [O, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        for engine in self.engines():
+            self.assertEqual(engine.rollouts(state, 10), (10, 0, 0))
+            self.assertEqual(sum(engine.rollouts(GAME_333.new_state(), 50)), 50)
+
+    def test_tree_reuse(self):
+        """After two moves played through the tree, the subtree under them becomes the root."""
+        engine = mcts.MCTS(GAME_333, seed=0)
+        state = GAME_333.new_state()
+        cell = engine.search(state, 200)
+        reply = next(iter(engine.root.children[cell].children))
+        state.make(cell)
+        state.make(reply)
+        subtree = engine.root.children[cell].children[reply]
+        self.assertTrue(engine.advance(state))
+        self.assertIs(engine.root, subtree)
+        self.assertGreater(engine.root.visits, 0)
+        other = GAME_333.new_state([[O, EMPTY, EMPTY], [EMPTY, X, EMPTY], [EMPTY, EMPTY, X]])
+        self.assertFalse(engine.advance(other))
+
+    def test_limits(self):
+        """The search stops at its step count or time limit, and reports its rate."""
+        engine = mcts.MCTS(mnk.Game(7, 7, 4), seed=0)
+        engine.search(engine.game.new_state(), 20)
+        self.assertEqual(engine.playouts, 20 * engine.batch)
+        self.assertEqual(mcts.MCTS(engine.game, vectorised=False).batch, mcts.SERIAL_BATCH)
+        self.assertGreater(engine.playouts_per_second(), 0)
+        start = time.perf_counter()
+        engine.search(engine.game.new_state(), None, time_limit=0.05)
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_monte_carlo(self):
+        """The tictactoe entry point returns a legal action, or None for a finished game."""
+        board = [[X, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertIn(monte_carlo(board, 50), actions(board))
+        self.assertIsNone(monte_carlo([[X, X, X], [O, O, EMPTY], [EMPTY] * 3]))
+
+
+class TestZobrist(unittest.TestCase):
+
+    #
+    # Zobrist hashing
+    # Hashes follow make / unmake with an XOR, and the canonical key is shared by symmetric positions.
+    #
+
+    def test_incremental(self):
+        """The hash depends only on the position, and taking moves back restores it."""
+        state = GAME_333.new_state()
+        for cell in (4, 0, 8, 2):
+            state.make(cell)
+        board_hash = state.hash
+        self.assertEqual(GAME_333.new_state(state.to_board()).hash, board_hash)
+        other = GAME_333.new_state()
+        for cell in (8, 2, 4, 0):
+            other.make(cell)
+        self.assertEqual(other.hash, board_hash)
+        while state.history:
+            state.unmake()
+        self.assertEqual(state.hash, 0)
+
+    def test_canonical_key(self):
+        """Every symmetry of a position has the same canonical key, which maps back to the position's cells."""
+        board = [[X, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        state = GAME_333.new_state(board)
+        state.track_symmetries()
+        key, _ = state.canonical_key()
+        for symmetry in GAME_333.symmetries:
+            image = GAME_333.new_state()
+            image.track_symmetries()
+            for cell, stone in enumerate(state.cells):
+                if (stone != EMPTY):
+                    image.place(symmetry[cell], stone)
+            self.assertEqual(image.canonical_key()[0], key)
+        state.make(4)
+        state.unmake()
+        self.assertEqual(state.canonical_key()[0], key)
+        different = GAME_333.new_state([[X, EMPTY, EMPTY], [EMPTY, O, EMPTY], [EMPTY, EMPTY, EMPTY]])
+        different.track_symmetries()
+        self.assertNotEqual(different.canonical_key()[0], key)
+
+    def test_symmetries(self):
+        """Square boards have eight symmetries and other boards four, each a permutation with its inverse."""
+        self.assertEqual(len(GAME_333.symmetries), 8)
+        game = mnk.Game(3, 4, 3)
+        self.assertEqual(len(game.symmetries), 4)
+        for symmetry, inverse in zip(game.symmetries, game.inverse_symmetries):
+            self.assertEqual(sorted(symmetry), list(range(game.size)))
+            self.assertEqual([inverse[symmetry[cell]] for cell in range(game.size)], list(range(game.size)))
+
+    def test_search_table(self):
+        """A search with a transposition table returns the same move and score with far fewer nodes."""
+        game = mnk.Game(3, 4, 3)
+        state = game.new_state([[X, EMPTY, EMPTY, EMPTY],
+                                [EMPTY, O, EMPTY, EMPTY],
+                                [EMPTY, EMPTY, EMPTY, EMPTY]])
+        plain = search.Search(state)
+        expected = plain.root()
+        hashed = search.Search(state, table=TranspositionTable())
+        self.assertEqual(hashed.root(), expected)
+        self.assertLess(hashed.nodes, plain.nodes / 2)
+        self.assertGreater(hashed.stats.hit_rate(), 0)
+        self.assertEqual(state.hash, game.new_state(state.to_board()).hash)
+        self.assertEqual(len(state.history), 2)
+
+
+class TestBoard(unittest.TestCase):
+
+    #
+    # Board value type
+    # Boards are immutable hashable values, and the game functions treat them as the list boards they stand for.
+    #
+
+    def test_same_as_list(self):
+        """Every game function gives the same answer for a Board as for its list board."""
+        for state in gametree.walk(GAME_333.new_state(), visited=gametree.VisitedBitmap(9)):
+            board = state.to_board()
+            packed = Board.from_list(board)
+            self.assertEqual(packed.to_list(), board)
+            self.assertEqual([list(row) for row in packed], board)
+            self.assertEqual(player(packed), player(board))
+            self.assertEqual(winner(packed), winner(board))
+            self.assertEqual(terminal(packed), terminal(board))
+            self.assertEqual(utility(packed), utility(board))
+            self.assertEqual(actions(packed), actions(board))
+        board = [[O, X, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(minimax(Board.from_list(board)), minimax(board))
+
+    def test_result(self):
+        """result() returns a new Board and leaves the old one unchanged, refusing taken cells."""
+        empty = Board()
+        board = result(empty, (1, 1))
+        self.assertIsInstance(board, Board)
+        self.assertEqual(empty, Board())
+        self.assertEqual(board[1][1], X)
+        self.assertEqual(player(board), O)
+        with self.assertRaises(Exception):
+            result(board, (1, 1))
+
+    def test_value(self):
+        """Boards are immutable, compare by position and work as dict keys."""
+        board = Board.from_list([[X, EMPTY, EMPTY], [EMPTY, O, EMPTY], [EMPTY, EMPTY, EMPTY]])
+        self.assertEqual({board: 1}[result(result(Board(), (0, 0)), (1, 1))], 1)
+        self.assertNotEqual(board, Board())
+        with self.assertRaises(AttributeError):
+            board.key = 0
+        with self.assertRaises(ValueError):
+            Board(1, 1)
+        with self.assertRaises(ValueError):
+            Board(512)
+        with self.assertRaises(ValueError):
+            Board(0, -1)
+
+    def test_memory(self):
+        """A Board takes less memory than a list board."""
+        memory = benchmark.bench_memory()
+        self.assertLess(memory["Board"], memory["list"] / 2)
+
+
+class TestPositionTable(unittest.TestCase):
+
+    #
+    # Position table
+    # The table of every board encoding agrees with the bitboard functions, and the game functions read it.
+    #
+
+    def test_every_position(self):
+        """Every pair of disjoint masks has its player, winner, terminal and empty cells in the table."""
+        for x in range(bitboard.FULL + 1):
+            for o in range(bitboard.FULL + 1):
+                if (x & o):
+                    continue
+                self.assertEqual(bitboard.POSITIONS[bitboard.TERNARY[x] + 2 * bitboard.TERNARY[o]],
+                                 (bitboard.player(x, o), bitboard.winner(x, o), bitboard.terminal(x, o),
+                                  bitboard.FULL & ~(x | o)))
+
+    def test_list_boards(self):
+        """A list board, its Board and the solution table share one index, and the game functions agree."""
+        for state in gametree.walk(GAME_333.new_state(), visited=gametree.VisitedBitmap(9)):
+            board = state.to_board()
+            x, o = bitboard.from_board(board)
+            index = bitboard.ternary_index(board)
+            self.assertEqual(index, book.position_index(x, o))
+            self.assertEqual(index, bitboard.ternary_index(Board.from_list(board)))
+            self.assertEqual(player(board), bitboard.player(x, o))
+            self.assertEqual(winner(board), bitboard.winner(x, o))
+            self.assertEqual(terminal(board), bitboard.terminal(x, o))
+            self.assertEqual(actions(board), GAME_333.actions(board))
+            if (terminal(board)):
+                self.assertEqual(utility(board), bitboard.utility(x, o))
+
+
+class TestTactics(unittest.TestCase):
+
+    #
+    # Tactical shortcuts
+    # The bitboard search takes a win at once, searches only the block of a single threat, and scores two threats
+    # against the mover as lost, without changing any result.
+    #
+
+    def test_immediate_win(self):
+        """A position with a winning cell is answered without searching any move."""
+        x, o = bitboard.from_board([[X, X, EMPTY],
+                                    [O, O, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        context = bitboard.Context(TranspositionTable())
+        self.assertEqual(bitboard.minimax(x, o, context=context), 2)
+        self.assertEqual(context.stats.immediate_wins, 1)
+        self.assertEqual(context.nodes, 1)
+        self.assertEqual(context.stats.pv, [2])
+
+    def test_double_threat(self):
+        """Two threats against the mover score as a loss on the opponent's next move."""
+        x, o = bitboard.from_board([[O, O, EMPTY],
+                                    [O, X, X],
+                                    [EMPTY, X, EMPTY]])
+        context = bitboard.Context(TranspositionTable())
+        self.assertEqual(bitboard.max_value(x, o, bitboard.MIN_SCORE, bitboard.MAX_SCORE, context), -2)
+        self.assertEqual(context.stats.forced_losses, 1)
+        self.assertEqual(context.nodes, 1)
+        self.assertEqual(len(bitboard.principal_variation(x, o, context.table)), 2)
+
+    def test_forced_block(self):
+        """With a single threat against it, the mover searches only the blocking cell."""
+        x, o = bitboard.from_board([[O, X, EMPTY],
+                                    [EMPTY, X, EMPTY],
+                                    [EMPTY, EMPTY, EMPTY]])
+        context = bitboard.Context(TranspositionTable())
+        self.assertEqual(bitboard.minimax(x, o, context=context), 7)
+        self.assertGreater(context.stats.forced_blocks, 0)
+        self.assertEqual(context.stats.nodes[4], 1)
+
+    def test_empty_board(self):
+        """The shortcuts fire in a search of the empty board, every opening still draws, and the stats report them."""
+        stats = SearchStats()
+        context = bitboard.Context(TranspositionTable(), stats)
+        self.assertEqual(set(score for _, score in bitboard.analyse(0, 0, context=context)), {0})
+        self.assertGreater(stats.forced_blocks, 0)
+        self.assertGreater(stats.forced_losses, 0)
+        self.assertEqual(stats.as_dict()["forced_blocks"], stats.forced_blocks)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file